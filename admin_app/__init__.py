@@ -1,4 +1,6 @@
+import click
 from flask import Flask
+from sqlalchemy import event
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
@@ -62,18 +64,49 @@ def sync_default_data() -> None:
     db.session.commit()
 
 
+def configure_sqlite(app: Flask) -> None:
+    """Set the journal mode and lock timeout of SQLite connections.
+
+    In WAL mode readers are not blocked by a write transaction, such as a
+    running import, and writers wait up to ``SQLITE_BUSY_TIMEOUT`` seconds
+    for the lock instead of failing at once.
+    """
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    journal_mode = app.config.get("SQLITE_JOURNAL_MODE")
+    if engine.url.database in (None, "", ":memory:"):
+        journal_mode = None
+    busy_timeout = int(app.config.get("SQLITE_BUSY_TIMEOUT", 0) * 1000)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if journal_mode:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        if busy_timeout:
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.close()
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object('config.Config')
     db.init_app(app)
+    configure_sqlite(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'admin.login'
 
     from . import models  # noqa: F401
+    from . import catalog
+    from . import changes  # noqa: F401
+    from . import search  # noqa: F401
     from .api import api_bp
     from .routes import admin_bp
 
+    catalog.init_app(app)
     app.register_blueprint(api_bp)
     app.register_blueprint(admin_bp)
 
@@ -117,6 +150,46 @@ def register_cli(app: Flask) -> None:
             sync_default_data()
         print("Default data synced")
 
+    @app.cli.command("compact-catalog-changes")
+    @click.option(
+        "--keep",
+        default=10000,
+        show_default=True,
+        help="Number of newest change log entries to keep.",
+    )
+    def compact_catalog_changes_command(keep):
+        """Trim the catalog change log used by delta sync."""
+        from .changes import compact
+
+        deleted = compact(keep)
+        print(f"Removed {deleted} change log entries")
+
+    @app.cli.command("reindex-services")
+    def reindex_services_command():
+        """Rebuild the full-text index used by service search."""
+        from .search import rebuild_fts
+
+        rebuild_fts()
+        print("Service search index rebuilt")
+
+    @app.cli.command("outbox-worker")
+    @click.option(
+        "--interval",
+        default=None,
+        type=float,
+        help="Seconds between polls (default: OUTBOX_POLL_INTERVAL).",
+    )
+    @click.option(
+        "--once", is_flag=True, help="Deliver due messages and exit."
+    )
+    def outbox_worker_command(interval, once):
+        """Deliver queued emails from the outbox."""
+        from .outbox import run_worker
+
+        if interval is None:
+            interval = app.config.get("OUTBOX_POLL_INTERVAL", 5)
+        run_worker(interval, once=once)
+
 
 def ensure_db_initialized(app: Flask) -> None:
     """Create database tables and default data if none exist."""
@@ -1,177 +1,351 @@
-from flask import Blueprint, jsonify, request, current_app
-import smtplib
-from email.message import EmailMessage
-from sqlalchemy.orm import joinedload
-from .models import (
-    Language,
-    Currency,
-    UnitOfMeasurement,
-    Category,
-    Service,
-    Setting,
+from flask import (
+    Blueprint,
+    jsonify,
+    request,
+    current_app,
+    stream_with_context,
+)
+import json
+from .catalog import (
+    bootstrap_snapshot,
+    buffered,
+    build_category_services,
+    calculator_data_snapshot,
+    category_ids,
+    category_services_snapshot,
+    columnar_snapshot,
+    current_version,
+    iter_calculator_data,
+    iter_catalog_export,
+    language_codes,
+)
+from .changes import build_changes
+from .emails import currency_symbols, default_currency, quote_email
+from .schema import Array, Code, Integer, Number, Object, Schema, String
+from .search import search_services
+from .models import OutboxMessage
+from .idempotency import idempotent
+from .outbox import enqueue, status_of
+from .ratelimit import check_limit, limit_by_ip
+from .pricing import (
+    QuoteError,
+    calculate_quote,
+    iter_batch_results,
+    iter_ndjson,
+    price_table,
 )
 import re
 
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
+RATE_LIMITED = {"error": "Too many requests"}
+SEND_RATE_LIMITED = {"status": "error", "message": "Too many requests."}
+
 
 @api_bp.route('/calculator-data', methods=['GET'])
+@limit_by_ip('data-ip', RATE_LIMITED)
 def calculator_data():
+    columnar = request.args.get('format') == 'columnar'
+    if request.args.get('stream') == '1':
+        return _stream_response(iter_calculator_data(columnar))
     try:
-        languages = [
-            {"id": lang.code, "name": lang.name}
-            for lang in Language.query.all()
-        ]
-        currencies = [
-            {
-                "id": cur.code,
-                "code": cur.code,
-                "symbol": cur.symbol,
-                "name": cur.name,
-            }
-            for cur in Currency.query.all()
-        ]
-        units = [
-            {
-                "id": unit.id,
-                "name": unit.name,
-                "abbreviation": unit.abbreviation,
-            }
-            for unit in UnitOfMeasurement.query.all()
-        ]
-        categories = []
-        for cat in Category.query.options(joinedload(Category.services)).all():
-            services = [
-                {
-                    "id": srv.id,
-                    "name": srv.name,
-                    "price": f"{srv.price:.2f}",
-                    "unit_id": srv.unit_id,
-                }
-                for srv in cat.services
-            ]
-            categories.append(
-                {
-                    "id": cat.id,
-                    "name": cat.name,
-                    "services": services,
-                }
-            )
-        settings = {}
-        for key in ["default_currency_id", "default_language_id"]:
-            s = Setting.query.filter_by(key=key).first()
-            if s:
-                settings[key] = s.value
-        data = {
-            "settings": settings,
-            "languages": languages,
-            "currencies": currencies,
-            "currency_by_lang": current_app.config.get("CURRENCY_BY_LANG", {}),
-            "units_of_measurement": units,
-            "categories": categories,
-        }
-        return jsonify(data), 200
+        if columnar:
+            snapshot = columnar_snapshot()
+        else:
+            snapshot = calculator_data_snapshot()
     except Exception:
         current_app.logger.exception("Error fetching calculator data")
         return jsonify({"error": "Internal server error"}), 500
+    return _snapshot_response(snapshot)
+
 
+@api_bp.route('/calculator-data/export', methods=['GET'])
+@limit_by_ip('data-ip', RATE_LIMITED)
+def calculator_data_export():
+    response = _stream_response(iter_catalog_export())
+    response.headers['Content-Disposition'] = (
+        'attachment; filename=catalog.json'
+    )
+    return response
 
-def _is_number(value: str) -> bool:
+
+def _stream_response(chunks):
+    """Stream JSON ``chunks`` without materializing the whole document."""
+    response = current_app.response_class(
+        stream_with_context(buffered(chunks)),
+        mimetype='application/json',
+    )
+    response.headers['X-Catalog-Version'] = str(current_version())
+    return response
+
+
+@api_bp.route('/calculator-data/bootstrap', methods=['GET'])
+def calculator_bootstrap():
     try:
-        float(value)
-        return True
+        snapshot = bootstrap_snapshot()
     except Exception:
-        return False
+        current_app.logger.exception("Error fetching calculator bootstrap")
+        return jsonify({"error": "Internal server error"}), 500
+    return _snapshot_response(snapshot)
 
 
-EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
+MAX_PAGE_SIZE = 1000
 
 
-@api_bp.route('/send-calculation', methods=['POST'])
-def send_calculation():
-    data = request.get_json(silent=True) or {}
+@api_bp.route('/categories/<int:category_id>/services', methods=['GET'])
+def category_services(category_id):
+    default_limit = current_app.config.get('CATALOG_PAGE_SIZE', 500)
+    limit = request.args.get('limit', default_limit, type=int)
+    after = request.args.get('after', 0, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if category_id not in category_ids():
+        return jsonify({"error": "Category not found"}), 404
+    if after == 0 and limit == default_limit:
+        return _snapshot_response(
+            category_services_snapshot(category_id, limit)
+        )
+    return jsonify(build_category_services(category_id, after, limit)), 200
 
-    user_email = data.get('user_email')
-    language_code = data.get('language_code')
-    items = data.get('calculation_items')
-    grand_total = data.get('grand_total_price')
 
-    if not user_email or not EMAIL_REGEX.match(user_email):
+@api_bp.route('/calculator-data/changes', methods=['GET'])
+def calculator_data_changes():
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
         return jsonify(
-            {"status": "error", "message": "Invalid email address."}
+            {"error": "since must be a non-negative catalog version"}
         ), 400
+    try:
+        data = build_changes(since)
+    except Exception:
+        current_app.logger.exception("Error fetching catalog changes")
+        return jsonify({"error": "Internal server error"}), 500
+    return jsonify(data), 200
 
-    if not language_code or not Language.query.filter_by(
-        code=language_code
-    ).first():
-        return jsonify(
-            {"status": "error", "message": "Invalid language code."}
-        ), 400
 
-    if not items or not isinstance(items, list):
+@api_bp.route('/services/search', methods=['GET'])
+def services_search():
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    try:
+        data = search_services(query, limit, offset)
+    except Exception:
+        current_app.logger.exception("Error searching services")
+        return jsonify({"error": "Internal server error"}), 500
+    return jsonify(data), 200
+
+
+def _snapshot_response(snapshot):
+    """Serve ``snapshot`` honouring Accept-Encoding and validators."""
+    encoding = request.accept_encodings.best_match(snapshot.ENCODINGS)
+    body, etag = snapshot.variant(encoding)
+    response = current_app.response_class(body, mimetype='application/json')
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.headers['X-Catalog-Version'] = str(snapshot.version)
+    response.last_modified = snapshot.last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get(
+        'CATALOG_HTTP_MAX_AGE', 0
+    )
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
+
+
+ITEM_NUMBER = {
+    "message": "Numeric values required in items.",
+    "missing": "Invalid item structure.",
+}
+
+EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+SEND_CALCULATION = Schema(
+    Object(
+        {
+            "user_email": String(
+                pattern=EMAIL_REGEX, message="Invalid email address."
+            ),
+            "language_code": Code(
+                language_codes, message="Invalid language code."
+            ),
+            "currency_code": Code(
+                currency_symbols,
+                required=False,
+                message="Invalid currency code.",
+            ),
+            "calculation_items": Array(
+                Object(
+                    {
+                        "service_id": Integer(
+                            required=False,
+                            message="service_id must be an integer.",
+                        ),
+                        "quantity": Number(**ITEM_NUMBER),
+                        "price_per_unit": Number(**ITEM_NUMBER),
+                        "item_total_price": Number(**ITEM_NUMBER),
+                    },
+                    message="Invalid item structure.",
+                ),
+                min_items=1,
+                message="calculation_items must be a non-empty list.",
+            ),
+            "grand_total_price": Number(
+                message="Invalid grand_total_price."
+            ),
+        },
+        message="Request body must be a JSON object.",
+    )
+)
+
+
+@api_bp.route('/calculate', methods=['POST'])
+def calculate():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
         return jsonify(
             {
                 "status": "error",
-                "message": "calculation_items must be a non-empty list.",
+                "message": "Request body must be a JSON object.",
             }
         ), 400
+    try:
+        quote = calculate_quote(data.get('items'))
+    except QuoteError as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 400
+    return jsonify(quote), 200
 
-    for item in items:
-        if not all(
-            k in item
-            for k in ["quantity", "price_per_unit", "item_total_price"]
-        ):
-            return jsonify(
-                {"status": "error", "message": "Invalid item structure."}
-            ), 400
-        if not (
-            _is_number(item["quantity"])
-            and _is_number(item["price_per_unit"])
-            and _is_number(item["item_total_price"])
-        ):
+
+NDJSON_MIMETYPES = {'application/x-ndjson', 'application/jsonl'}
+
+
+@api_bp.route('/calculate/batch', methods=['POST'])
+def calculate_batch():
+    config = current_app.config
+    max_bytes = config.get('BATCH_MAX_BYTES', 16 * 1024 * 1024)
+    body = request.stream.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        return jsonify(
+            {"status": "error", "message": "Request body too large."}
+        ), 413
+
+    if request.mimetype in NDJSON_MIMETYPES:
+        quotes = iter_ndjson(body)
+    else:
+        try:
+            quotes = json.loads(body).get('quotes')
+        except (ValueError, AttributeError):
+            quotes = None
+        if not isinstance(quotes, list):
             return jsonify(
-                {
-                    "status": "error",
-                    "message": "Numeric values required in items.",
-                }
+                {"status": "error", "message": "quotes must be a list."}
             ), 400
 
-    if not grand_total or not _is_number(grand_total):
+    results = iter_batch_results(
+        price_table(),
+        quotes,
+        max_quotes=config.get('BATCH_MAX_QUOTES', 10000),
+        max_items=config.get('BATCH_MAX_ITEMS', 200000),
+    )
+    return current_app.response_class(
+        stream_with_context(buffered(results)),
+        mimetype='application/x-ndjson',
+    )
+
+
+def _send_fingerprint(data):
+    return [
+        str(data.get('user_email') or '').strip().lower(),
+        data.get('language_code'),
+        data.get('currency_code'),
+        data.get('calculation_items'),
+        data.get('grand_total_price'),
+    ]
+
+
+@api_bp.route('/send-calculation', methods=['POST'])
+@limit_by_ip('send-ip', SEND_RATE_LIMITED)
+@idempotent(_send_fingerprint)
+def send_calculation():
+    data = request.get_json(silent=True)
+    errors = SEND_CALCULATION.validate(data)
+    if errors:
         return jsonify(
-            {"status": "error", "message": "Invalid grand_total_price."}
+            {
+                "status": "error",
+                "message": errors[0]["message"],
+                "errors": errors,
+            }
         ), 400
 
-    message = EmailMessage()
-    message['Subject'] = 'Calculation Results'
+    user_email = data['user_email']
+    language_code = data['language_code']
+    items = data['calculation_items']
+    grand_total = data['grand_total_price']
+
+    limited = check_limit(
+        'send-email', user_email.strip().lower(), SEND_RATE_LIMITED
+    )
+    if limited is not None:
+        return limited
+
+    currency_code = data.get('currency_code') or default_currency(
+        language_code
+    )
+    symbols = currency_symbols()
+    email = quote_email(language_code)
+
+    # Reprice on the server when the client tells us which services were
+    # used, so the email never repeats a total computed in the browser.
+    if all(
+        isinstance(item, dict) and item.get('service_id') is not None
+        for item in items
+    ):
+        try:
+            quote = calculate_quote(items)
+        except QuoteError as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 400
+        lines = quote['items']
+        grand_total = quote['grand_total_price']
+    else:
+        # Without service ids there is no name to look up; text sent by the
+        # client never goes into the email, so lines get a generic label.
+        label = email.strings["service"]
+        lines = [
+            {
+                "name": f"{label} {number}",
+                "quantity": str(item["quantity"]),
+                "price_per_unit": str(item["price_per_unit"]),
+                "item_total_price": str(item["item_total_price"]),
+            }
+            for number, item in enumerate(items, 1)
+        ]
+        grand_total = str(grand_total)
+
+    message = email.render(
+        lines, grand_total, symbols.get(currency_code, "")
+    )
     sender = (
         current_app.config.get("SMTP_USERNAME", "no-reply@example.com")
         or "no-reply@example.com"
     )
     message['From'] = sender
     message['To'] = user_email
-    message.set_content(f'Total price: {grand_total}')
-
-    try:
-        host = current_app.config['SMTP_SERVER']
-        port = current_app.config['SMTP_PORT']
-        username = current_app.config.get('SMTP_USERNAME')
-        password = current_app.config.get('SMTP_PASSWORD')
-        use_tls = current_app.config.get('SMTP_USE_TLS', False)
-
-        with smtplib.SMTP(host, port) as server:
-            if use_tls:
-                server.starttls()
-            if username:
-                server.login(username, password or '')
-            server.send_message(message)
-    except smtplib.SMTPException:
-        return jsonify(
-            {"status": "error", "message": "Failed to send email."}
-        ), 500
 
+    entry = enqueue(message)
     return jsonify(
         {
             "status": "success",
-            "message": "Calculation successfully sent to your email.",
+            "message": "Calculation queued for delivery to your email.",
+            "message_id": entry.token,
         }
-    ), 200
+    ), 202
+
+
+@api_bp.route('/send-calculation/<message_id>', methods=['GET'])
+def send_calculation_status(message_id):
+    entry = OutboxMessage.query.filter_by(token=message_id).first()
+    if entry is None:
+        return jsonify({"status": "error", "message": "Unknown message."}), 404
+    return jsonify({"status": "success", **status_of(entry)})
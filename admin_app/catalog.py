@@ -0,0 +1,447 @@
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import (
+    Language,
+    Currency,
+    UnitOfMeasurement,
+    Category,
+    Service,
+    Setting,
+    CatalogChange,
+)
+
+CATALOG_MODELS = (
+    Language,
+    Currency,
+    UnitOfMeasurement,
+    Category,
+    Service,
+    Setting,
+)
+
+SETTING_KEYS = ["default_currency_id", "default_language_id"]
+
+_CHANGED_FLAG = "catalog_changed"
+
+
+class _Entry:
+    __slots__ = ("version", "built_at", "value")
+
+    def __init__(self, version: int, built_at: float, value: Any):
+        self.version = version
+        self.built_at = built_at
+        self.value = value
+
+
+class CatalogCache:
+    """Process-wide cache of values derived from the catalog tables.
+
+    Every entry is tagged with the catalog version it was built from. The
+    version is bumped after each commit touching one of ``CATALOG_MODELS``,
+    so a stale entry is rebuilt on its next access. ``ttl`` (seconds, ``0``
+    disables it) bounds staleness for commits made by other processes.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self.version = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._build_lock = threading.Lock()
+        self._version_lock = threading.Lock()
+
+    def bump(self) -> int:
+        with self._version_lock:
+            self.version += 1
+            return self.version
+
+    def _fresh(self, entry: Optional[_Entry]) -> bool:
+        if entry is None or entry.version != self.version:
+            return False
+        return not self.ttl or time.monotonic() - entry.built_at < self.ttl
+
+    def get(self, key: str, builder: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, building it when stale."""
+        entry = self._entries.get(key)
+        if self._fresh(entry):
+            return entry.value
+        with self._build_lock:
+            entry = self._entries.get(key)
+            if self._fresh(entry):
+                return entry.value
+            version = self.version
+            value = builder()
+            self._entries[key] = _Entry(version, time.monotonic(), value)
+            return value
+
+    def peek(self, key: str) -> Any:
+        """Return the last value built for ``key`` even if it is stale."""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def clear(self) -> None:
+        self._entries = {}
+
+
+def init_app(app: Flask) -> None:
+    app.extensions["catalog_cache"] = CatalogCache(
+        ttl=app.config.get("CATALOG_CACHE_TTL", 0)
+    )
+
+
+def get_catalog_cache() -> CatalogCache:
+    return current_app.extensions["catalog_cache"]
+
+
+def mark_catalog_changed(session: Session) -> None:
+    """Flag ``session`` so the catalog version is bumped on commit.
+
+    ORM changes are detected automatically; this is only needed for bulk
+    statements executed outside of the unit of work.
+    """
+    session.info[_CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_changes(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, CATALOG_MODELS):
+            mark_catalog_changed(session)
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_catalog_version(session):
+    if session.info.pop(_CHANGED_FLAG, False) and has_app_context():
+        get_catalog_cache().bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_changes(session):
+    session.info.pop(_CHANGED_FLAG, None)
+
+
+def current_version() -> int:
+    """Return the id of the newest change log entry (``0`` if empty)."""
+    return db.session.query(func.max(CatalogChange.id)).scalar() or 0
+
+
+def _reference_data() -> dict:
+    """Collect everything but the categories for the calculator widget."""
+    languages = [
+        {"id": lang.code, "name": lang.name}
+        for lang in Language.query.all()
+    ]
+    currencies = [
+        {
+            "id": cur.code,
+            "code": cur.code,
+            "symbol": cur.symbol,
+            "name": cur.name,
+        }
+        for cur in Currency.query.all()
+    ]
+    units = [
+        {
+            "id": unit.id,
+            "name": unit.name,
+            "abbreviation": unit.abbreviation,
+        }
+        for unit in UnitOfMeasurement.query.all()
+    ]
+    settings = {
+        s.key: s.value
+        for s in Setting.query.filter(Setting.key.in_(SETTING_KEYS))
+    }
+    return {
+        "settings": settings,
+        "languages": languages,
+        "currencies": currencies,
+        "currency_by_lang": current_app.config.get("CURRENCY_BY_LANG", {}),
+        "units_of_measurement": units,
+    }
+
+
+def _service_data(srv) -> dict:
+    return {
+        "id": srv.id,
+        "name": srv.name,
+        "price": f"{srv.price:.2f}",
+        "unit_id": srv.unit_id,
+    }
+
+
+def stream_rows(statement):
+    """Execute ``statement`` fetching rows in batches of a bounded size."""
+    batch = current_app.config.get("CATALOG_STREAM_BATCH", 1000)
+    return db.session.execute(statement.execution_options(yield_per=batch))
+
+
+def _dumps(value) -> str:
+    return current_app.json.dumps(value)
+
+
+COLUMNAR_FIELDS = ["id", "name", "price", "unit_id"]
+PRICE_SCALE = 2
+
+
+def _columnar_service(row) -> list:
+    return [row.id, row.name, int(row.price.scaleb(PRICE_SCALE)), row.unit_id]
+
+
+def iter_calculator_data(columnar: bool = False) -> Iterator[str]:
+    """Encode the calculator payload incrementally.
+
+    Categories and services are read in batches and written one row at a
+    time, so memory use does not grow with the catalog. The output is the
+    same document ``json.dumps`` with sorted keys would produce.
+
+    With ``columnar`` every service is a row tuple following the
+    ``service_fields`` header and prices are integers in minor units
+    (``price_scale`` decimal places).
+    """
+    reference = _reference_data()
+    encode_service = _service_data
+    if columnar:
+        reference.update(
+            format="columnar",
+            service_fields=COLUMNAR_FIELDS,
+            price_scale=PRICE_SCALE,
+        )
+        encode_service = _columnar_service
+    reference = _dumps(reference)
+    yield '{"categories": ['
+    services = iter(
+        stream_rows(
+            select(
+                Service.id,
+                Service.name,
+                Service.price,
+                Service.unit_id,
+                Service.category_id,
+            )
+            .where(Service.category_id.is_not(None))
+            .order_by(Service.category_id, Service.id)
+        )
+    )
+    pending = next(services, None)
+    categories = stream_rows(
+        select(Category.id, Category.name).order_by(Category.id)
+    )
+    for i, cat in enumerate(categories):
+        while pending is not None and pending.category_id < cat.id:
+            pending = next(services, None)
+        yield '%s{"id": %s, "name": %s, "services": [' % (
+            ", " if i else "",
+            _dumps(cat.id),
+            _dumps(cat.name),
+        )
+        separator = ""
+        while pending is not None and pending.category_id == cat.id:
+            yield separator + _dumps(encode_service(pending))
+            separator = ", "
+            pending = next(services, None)
+        yield "]}"
+    yield "], " + reference[1:]
+
+
+def iter_catalog_export() -> Iterator[str]:
+    """Encode the whole catalog, including uncategorized services."""
+    reference = _dumps(_reference_data())
+    yield '{"version": %d, %s, "categories": [' % (
+        current_version(),
+        reference[1:-1],
+    )
+    categories = stream_rows(
+        select(Category.id, Category.name).order_by(Category.id)
+    )
+    for i, cat in enumerate(categories):
+        yield (", " if i else "") + _dumps({"id": cat.id, "name": cat.name})
+    yield '], "services": ['
+    services = stream_rows(
+        select(
+            Service.id,
+            Service.name,
+            Service.price,
+            Service.unit_id,
+            Service.category_id,
+        ).order_by(Service.id)
+    )
+    for i, srv in enumerate(services):
+        data = _service_data(srv)
+        data["category_id"] = srv.category_id
+        yield (", " if i else "") + _dumps(data)
+    yield "]}"
+
+
+def buffered(chunks: Iterable[str], size: int = 64 * 1024) -> Iterator[bytes]:
+    """Join small string chunks into UTF-8 blocks of about ``size`` bytes."""
+    parts = []
+    length = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+            length = 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def build_bootstrap_data() -> dict:
+    """Collect the calculator reference data with category headers only."""
+    counts = dict(
+        db.session.query(Service.category_id, func.count(Service.id))
+        .group_by(Service.category_id)
+        .all()
+    )
+    data = _reference_data()
+    data["categories"] = [
+        {
+            "id": cat.id,
+            "name": cat.name,
+            "service_count": counts.get(cat.id, 0),
+        }
+        for cat in Category.query.order_by(Category.name, Category.id)
+    ]
+    return data
+
+
+def build_category_services(
+    category_id: int, after: int = 0, limit: int = 500
+) -> dict:
+    """Return one keyset page of a category's services ordered by id."""
+    rows = (
+        Service.query.filter(
+            Service.category_id == category_id, Service.id > after
+        )
+        .order_by(Service.id)
+        .limit(limit + 1)
+        .all()
+    )
+    services = [_service_data(srv) for srv in rows[:limit]]
+    return {
+        "category_id": category_id,
+        "services": services,
+        "next_after": services[-1]["id"] if len(rows) > limit else None,
+    }
+
+
+class CatalogSnapshot:
+    """Encoded payload with the validators used for conditional requests.
+
+    The gzip and deflate variants are compressed once when the snapshot is
+    built so serving them is a plain copy of bytes.
+    """
+
+    __slots__ = ("body", "version", "etag", "last_modified", "encodings")
+
+    ENCODINGS = ("gzip", "deflate")
+
+    def __init__(self, body: bytes, version: int, last_modified: datetime):
+        self.body = body
+        self.version = version
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = last_modified
+        self.encodings = {
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+            "deflate": zlib.compress(body, 9),
+        }
+
+    def variant(self, encoding: Optional[str]) -> Tuple[bytes, str]:
+        """Return the body and ETag for ``encoding`` (``None`` = identity)."""
+        if encoding in self.encodings:
+            return self.encodings[encoding], f"{self.etag}-{encoding}"
+        return self.body, self.etag
+
+
+def _snapshot(key: str, encode: Callable[[], bytes]) -> CatalogSnapshot:
+    cache = get_catalog_cache()
+
+    def build() -> CatalogSnapshot:
+        version = current_version()
+        body = encode()
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        snapshot = CatalogSnapshot(body, version, now)
+        previous = cache.peek(key)
+        if previous is not None and previous.etag == snapshot.etag:
+            snapshot.last_modified = previous.last_modified
+        return snapshot
+
+    return cache.get(key, build)
+
+
+def _encode(data: dict) -> bytes:
+    return (current_app.json.dumps(data) + "\n").encode("utf-8")
+
+
+def calculator_data_snapshot() -> CatalogSnapshot:
+    """Return the encoded calculator payload for the current version."""
+    return _snapshot(
+        "calculator-data",
+        lambda: b"".join(buffered(iter_calculator_data())) + b"\n",
+    )
+
+
+def columnar_snapshot() -> CatalogSnapshot:
+    """Return the encoded columnar calculator payload."""
+    return _snapshot(
+        "calculator-data:columnar",
+        lambda: b"".join(buffered(iter_calculator_data(columnar=True)))
+        + b"\n",
+    )
+
+
+def bootstrap_snapshot() -> CatalogSnapshot:
+    """Return the encoded bootstrap payload for the current version."""
+    return _snapshot("bootstrap", lambda: _encode(build_bootstrap_data()))
+
+
+def category_ids() -> frozenset:
+    """Return the ids of all categories for the current version."""
+    return get_catalog_cache().get(
+        "category-ids",
+        lambda: frozenset(
+            cid for (cid,) in db.session.query(Category.id).all()
+        ),
+    )
+
+
+def language_codes() -> frozenset:
+    """Return the codes of all languages for the current version."""
+    return get_catalog_cache().get(
+        "language-codes",
+        lambda: frozenset(
+            code for (code,) in db.session.query(Language.code).all()
+        ),
+    )
+
+
+def row_count(model) -> int:
+    """Return the number of rows of catalog ``model``, cached per version."""
+    return get_catalog_cache().get(
+        f"count:{model.__tablename__}",
+        lambda: db.session.query(func.count(model.id)).scalar(),
+    )
+
+
+def category_services_snapshot(
+    category_id: int, limit: int
+) -> CatalogSnapshot:
+    """Return the encoded first page of a category's services."""
+    return _snapshot(
+        f"category-services:{category_id}:{limit}",
+        lambda: _encode(build_category_services(category_id, limit=limit)),
+    )
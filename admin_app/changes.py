@@ -0,0 +1,237 @@
+from itertools import chain, islice
+from typing import Dict, Iterable, List
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .catalog import current_version, get_catalog_cache, mark_catalog_changed
+from .models import (
+    Language,
+    Currency,
+    UnitOfMeasurement,
+    Category,
+    Service,
+    Setting,
+    CatalogChange,
+)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# SQLite allows at most 999 bound parameters per statement.
+CHUNK_SIZE = 500
+
+
+class _Entity:
+    """How a catalog model is identified and serialized in the change log."""
+
+    def __init__(self, name, model, key, serialize, numeric=True):
+        self.name = name
+        self.model = model
+        self.key = key
+        self.serialize = serialize
+        self.numeric = numeric
+
+    def key_of(self, obj) -> str:
+        return str(getattr(obj, self.key))
+
+    def client_id(self, key: str):
+        return int(key) if self.numeric else key
+
+
+ENTITIES = [
+    _Entity(
+        "language",
+        Language,
+        "code",
+        lambda o: {"id": o.code, "name": o.name},
+        numeric=False,
+    ),
+    _Entity(
+        "currency",
+        Currency,
+        "code",
+        lambda o: {
+            "id": o.code,
+            "code": o.code,
+            "symbol": o.symbol,
+            "name": o.name,
+        },
+        numeric=False,
+    ),
+    _Entity(
+        "unit",
+        UnitOfMeasurement,
+        "id",
+        lambda o: {
+            "id": o.id,
+            "name": o.name,
+            "abbreviation": o.abbreviation,
+        },
+    ),
+    _Entity(
+        "category",
+        Category,
+        "id",
+        lambda o: {"id": o.id, "name": o.name},
+    ),
+    _Entity(
+        "service",
+        Service,
+        "id",
+        lambda o: {
+            "id": o.id,
+            "name": o.name,
+            "price": f"{o.price:.2f}",
+            "unit_id": o.unit_id,
+            "category_id": o.category_id,
+        },
+    ),
+    _Entity(
+        "setting",
+        Setting,
+        "key",
+        lambda o: {"id": o.key, "value": o.value},
+        numeric=False,
+    ),
+]
+ENTITY_BY_MODEL = {e.model: e for e in ENTITIES}
+ENTITY_BY_NAME = {e.name: e for e in ENTITIES}
+
+
+def chunked(values: Iterable, size: int = CHUNK_SIZE):
+    it = iter(values)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def record_changes(
+    session: Session, model, keys: Iterable, op: str
+) -> None:
+    """Log changes made by bulk statements that bypass the unit of work."""
+    entity = ENTITY_BY_MODEL[model]
+    rows = [
+        {"entity": entity.name, "entity_id": str(key), "op": op}
+        for key in keys
+    ]
+    if rows:
+        session.execute(insert(CatalogChange), rows)
+        mark_catalog_changed(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _log_catalog_changes(session, flush_context):
+    rows = []
+
+    def add(entity, key, op):
+        rows.append({"entity": entity.name, "entity_id": key, "op": op})
+
+    for obj in chain(session.new, session.dirty):
+        entity = ENTITY_BY_MODEL.get(type(obj))
+        if entity is None:
+            continue
+        if obj not in session.new:
+            if not session.is_modified(obj, include_collections=False):
+                continue
+            history = inspect(obj).attrs[entity.key].history
+            if history.deleted and history.deleted[0] is not None:
+                add(entity, str(history.deleted[0]), DELETE)
+        add(entity, entity.key_of(obj), UPSERT)
+    for obj in session.deleted:
+        entity = ENTITY_BY_MODEL.get(type(obj))
+        if entity is not None:
+            add(entity, entity.key_of(obj), DELETE)
+    if rows:
+        session.connection().execute(insert(CatalogChange.__table__), rows)
+
+
+def cached_version() -> int:
+    """Return :func:`current_version` cached per catalog generation."""
+    return get_catalog_cache().get("version", current_version)
+
+
+def _resync(version: int) -> dict:
+    return {"version": version, "resync": True, "changes": []}
+
+
+def build_changes(since: int) -> dict:
+    """Return the net changes made after catalog version ``since``.
+
+    Only the last operation per row is reported; upserts carry the row's
+    current data. A ``resync`` marker is returned when the log no longer
+    reaches back to ``since`` or the delta would exceed the configured
+    size, in which case the client should reload the full catalog.
+    """
+    if since == cached_version():
+        return {"version": since, "resync": False, "changes": []}
+    oldest, latest = db.session.query(
+        func.min(CatalogChange.id), func.max(CatalogChange.id)
+    ).one()
+    latest = latest or 0
+    if since > latest or (oldest is not None and since < oldest - 1):
+        return _resync(latest)
+
+    last_op: Dict[tuple, tuple] = {}
+    for version, entity, key, op in db.session.query(
+        CatalogChange.id,
+        CatalogChange.entity,
+        CatalogChange.entity_id,
+        CatalogChange.op,
+    ).filter(CatalogChange.id > since, CatalogChange.id <= latest):
+        last_op[(entity, key)] = (version, op)
+    if len(last_op) > current_app.config.get("CATALOG_CHANGES_MAX", 5000):
+        return _resync(latest)
+
+    upserts: Dict[str, List[str]] = {}
+    for (entity, key), (_, op) in last_op.items():
+        if op == UPSERT:
+            upserts.setdefault(entity, []).append(key)
+    current: Dict[tuple, dict] = {}
+    for name, keys in upserts.items():
+        entity = ENTITY_BY_NAME[name]
+        table = entity.model.__table__
+        for chunk in chunked(keys):
+            values = [entity.client_id(k) for k in chunk]
+            rows = db.session.execute(
+                select(table).where(table.c[entity.key].in_(values))
+            )
+            for row in rows:
+                current[(name, entity.key_of(row))] = entity.serialize(row)
+
+    changes = []
+    for (name, key), (version, op) in sorted(
+        last_op.items(), key=lambda item: item[1][0]
+    ):
+        entity = ENTITY_BY_NAME[name]
+        data = current.get((name, key))
+        if op == UPSERT and data is None:
+            op = DELETE
+        change = {
+            "version": version,
+            "entity": name,
+            "op": op,
+            "id": entity.client_id(key),
+        }
+        if op == UPSERT:
+            change["data"] = data
+        changes.append(change)
+    return {"version": latest, "resync": False, "changes": changes}
+
+
+def compact(keep: int) -> int:
+    """Delete all but the newest ``keep`` change log entries.
+
+    The newest entry is always kept so ids, and therefore versions, are
+    never reused. Returns the number of deleted entries.
+    """
+    latest = current_version()
+    cutoff = latest - max(keep, 1)
+    if cutoff <= 0:
+        return 0
+    deleted = CatalogChange.query.filter(
+        CatalogChange.id <= cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
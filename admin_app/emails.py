@@ -0,0 +1,166 @@
+import threading
+from functools import lru_cache
+from html import escape
+from email.message import EmailMessage
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import current_app
+from jinja2 import Template
+from markupsafe import Markup
+
+from .catalog import get_catalog_cache
+from .models import Currency, Setting
+
+DEFAULT_LANGUAGE = "en"
+
+EMAIL_STRINGS = {
+    "en": {
+        "subject": "Calculation Results",
+        "intro": "Here is the calculation you requested.",
+        "service": "Service",
+        "quantity": "Qty",
+        "unit": "Unit",
+        "unit_price": "Unit price",
+        "total": "Total",
+        "grand_total": "Total price",
+    },
+    "ru": {
+        "subject": "Результаты расчёта",
+        "intro": "Вот запрошенный вами расчёт.",
+        "service": "Услуга",
+        "quantity": "Кол-во",
+        "unit": "Ед.",
+        "unit_price": "Цена",
+        "total": "Итог",
+        "grand_total": "Общая сумма",
+    },
+    "pl": {
+        "subject": "Wyniki kalkulacji",
+        "intro": "Oto zamówiona przez Ciebie kalkulacja.",
+        "service": "Usługa",
+        "quantity": "Liczba",
+        "unit": "J.m.",
+        "unit_price": "Cena jednostkowa",
+        "total": "Suma",
+        "grand_total": "Suma całkowita",
+    },
+    "uk": {
+        "subject": "Результати розрахунку",
+        "intro": "Ось розрахунок, який ви запросили.",
+        "service": "Послуга",
+        "quantity": "Кількість",
+        "unit": "Од.",
+        "unit_price": "Ціна за одиницю",
+        "total": "Всього",
+        "grand_total": "Загальна сума",
+    },
+}
+
+_lock = threading.Lock()
+
+# Service names and units repeat across quotes; escape each one once.
+_escape = lru_cache(maxsize=16384)(escape)
+
+
+class QuoteEmail:
+    """Compiled quote templates bound to one language's strings."""
+
+    def __init__(self, language: str, text: Template, html: Template):
+        self.language = language
+        self.strings = EMAIL_STRINGS.get(
+            language, EMAIL_STRINGS[DEFAULT_LANGUAGE]
+        )
+        self.text = text
+        self.html = html
+
+    def render_bodies(
+        self, lines: Iterable[dict], grand_total: str, symbol: str = ""
+    ) -> Tuple[str, str]:
+        """Return the text and HTML bodies for priced quote ``lines``.
+
+        Each line is a dict as produced by
+        :meth:`~admin_app.pricing.PriceTable.price`. Names and units are
+        escaped here, memoized, instead of by Jinja's autoescape per cell,
+        which would dominate the rendering time of long quotes; the
+        numeric fields have already been validated and need no escaping.
+        """
+        rows = []
+        for line in lines:
+            name = line.get("name") or ""
+            unit = line.get("unit") or ""
+            rows.append(
+                (
+                    name,
+                    _escape(name),
+                    unit,
+                    _escape(unit),
+                    line["quantity"],
+                    line["price_per_unit"],
+                    line["item_total_price"],
+                )
+            )
+        context = {
+            "t": self.strings,
+            "language": self.language,
+            "grand_total": grand_total,
+        }
+        text = self.text.render(context, lines=rows, symbol=symbol)
+        # Markup so the autoescaped grand total row doesn't escape it again.
+        html = self.html.render(
+            context, lines=rows, symbol=Markup(_escape(symbol))
+        )
+        return text, html
+
+    def render(
+        self, lines: Iterable[dict], grand_total: str, symbol: str = ""
+    ) -> EmailMessage:
+        """Return a text and HTML message for priced quote ``lines``."""
+        text, html = self.render_bodies(lines, grand_total, symbol)
+        message = EmailMessage()
+        message["Subject"] = self.strings["subject"]
+        message.set_content(text)
+        message.add_alternative(html, subtype="html")
+        return message
+
+
+def quote_email(language: str) -> QuoteEmail:
+    """Return the :class:`QuoteEmail` for ``language``, compiling it once."""
+    app = current_app._get_current_object()
+    cache: Dict[str, QuoteEmail] = app.extensions.setdefault(
+        "quote_emails", {}
+    )
+    email = cache.get(language)
+    if email is None:
+        with _lock:
+            email = cache.get(language)
+            if email is None:
+                env = app.jinja_env
+                email = QuoteEmail(
+                    language,
+                    env.get_template("email/quote.txt"),
+                    env.get_template("email/quote.html"),
+                )
+                cache[language] = email
+    return email
+
+
+def currency_symbols() -> Dict[str, str]:
+    """Return currency symbols by code for the current catalog version."""
+    return get_catalog_cache().get(
+        "currency-symbols",
+        lambda: {
+            code: symbol
+            for code, symbol in Currency.query.with_entities(
+                Currency.code, Currency.symbol
+            )
+        },
+    )
+
+
+def default_currency(language: str) -> Optional[str]:
+    """Return the currency the widget shows by default for ``language``."""
+    code = current_app.config.get("CURRENCY_BY_LANG", {}).get(language)
+    if code:
+        return code
+    setting = Setting.query.filter_by(key="default_currency_id").first()
+    return setting.value if setting else None
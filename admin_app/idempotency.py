@@ -0,0 +1,182 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import current_app, request
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+_init_lock = threading.Lock()
+
+
+class _Stored:
+    __slots__ = ("expires_at", "status", "body", "mimetype", "done")
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.status = None
+        self.body = None
+        self.mimetype = None
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """First responses of recent requests, keyed by idempotency key.
+
+    Holds at most ``max_entries`` entries; expired entries are dropped on
+    access and the oldest one is evicted when the store is full. A request
+    arriving while the first one with the same key is still running waits
+    for its response instead of being processed twice.
+    """
+
+    def __init__(self, max_entries: int = 10000, wait: float = 10):
+        self.max_entries = max_entries
+        self.wait = wait
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Stored]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if entry.expires_at > now and len(entries) <= self.max_entries:
+                break
+            del entries[key]
+
+    def begin(self, key: str, ttl: float) -> Optional[_Stored]:
+        """Return the stored response for ``key`` or reserve it.
+
+        ``None`` means the caller must process the request and then call
+        :meth:`finish` or :meth:`abandon`.
+        """
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry.expires_at <= now:
+                    self._entries[key] = _Stored(now + ttl)
+                    self._entries.move_to_end(key)
+                    self._purge(now)
+                    self.misses += 1
+                    return None
+                self.hits += 1
+            if not entry.done.wait(self.wait):
+                # The first request is stuck; don't hold this one too.
+                return None
+            if entry.status is not None:
+                return entry
+            # The first request failed and was abandoned; try again.
+
+    def finish(self, key: str, status: int, body: bytes, mimetype: str):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            entry.status = status
+            entry.body = body
+            entry.mimetype = mimetype
+            entry.done.set()
+
+    def abandon(self, key: str) -> None:
+        """Forget ``key`` so the next request with it is processed."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge(time.monotonic())
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_store() -> IdempotencyStore:
+    app = current_app._get_current_object()
+    store = app.extensions.get("idempotency")
+    if store is None:
+        with _init_lock:
+            store = app.extensions.get("idempotency")
+            if store is None:
+                store = IdempotencyStore(
+                    app.config.get("IDEMPOTENCY_MAX_ENTRIES", 10000)
+                )
+                app.extensions["idempotency"] = store
+    return store
+
+
+def request_key(fingerprint: Callable[[dict], object]) -> Tuple[str, float]:
+    """Return the store key and TTL for the current request.
+
+    An ``Idempotency-Key`` header is kept for ``IDEMPOTENCY_KEY_TTL``
+    seconds. Without one, a hash of ``fingerprint(payload)`` deduplicates
+    identical submissions for ``IDEMPOTENCY_HASH_TTL`` seconds.
+    """
+    config = current_app.config
+    key = request.headers.get(HEADER, "").strip()
+    if key:
+        return (
+            f"{request.endpoint}:key:{key[:MAX_KEY_LENGTH]}",
+            config.get("IDEMPOTENCY_KEY_TTL", 86400),
+        )
+    payload = request.get_json(silent=True)
+    content = json.dumps(
+        fingerprint(payload if isinstance(payload, dict) else {}),
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return (
+        f"{request.endpoint}:hash:{digest}",
+        config.get("IDEMPOTENCY_HASH_TTL", 60),
+    )
+
+
+def idempotent(fingerprint: Callable[[dict], object]) -> Callable:
+    """Replay the first successful response of a repeated request."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            store = get_store()
+            key, ttl = request_key(fingerprint)
+            stored = store.begin(key, ttl)
+            if stored is not None:
+                response = current_app.response_class(
+                    stored.body, stored.status, mimetype=stored.mimetype
+                )
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                store.abandon(key)
+                raise
+            if 200 <= response.status_code < 300:
+                store.finish(
+                    key,
+                    response.status_code,
+                    response.get_data(),
+                    response.mimetype,
+                )
+            else:
+                store.abandon(key)
+            return response
+
+        return wrapper
+
+    return decorator
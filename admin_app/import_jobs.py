@@ -0,0 +1,347 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import select, update
+
+from . import db
+from .importer import ServiceImporter, validate_columns
+from .models import ImportJob
+from .utils.io import FileTooLarge, import_csv, open_text
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+POLL_INTERVAL = 5
+
+COPY_SIZE = 64 * 1024
+
+_worker_lock = threading.Lock()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Progress:
+    """Live counters of a running job, shared with the progress endpoint.
+
+    The job row is only updated when the import commits, every
+    ``IMPORT_COMMIT_EVERY`` rows or at the end; in between the counters
+    are read from here.
+    """
+
+    __slots__ = ("rows", "inserted", "updated", "error_count", "started")
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.started = time.monotonic()
+
+
+def _progress_registry(app: Flask) -> Dict[int, Progress]:
+    return app.extensions.setdefault("import_progress", {})
+
+
+def upload_dir() -> str:
+    path = current_app.config.get("IMPORT_UPLOAD_DIR") or os.path.join(
+        current_app.instance_path, "imports"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def submit(file) -> ImportJob:
+    """Store uploaded ``file`` and queue it for import.
+
+    The job runs on a worker thread, or before returning when
+    ``IMPORT_WORKERS = 0``. An upload longer than ``IMPORT_MAX_BYTES``
+    raises :class:`FileTooLarge` while it is saved, and no job is created.
+    """
+    max_bytes = current_app.config.get("IMPORT_MAX_BYTES", 0)
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=upload_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            size = 0
+            for chunk in iter(lambda: file.stream.read(COPY_SIZE), b""):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise FileTooLarge(max_bytes)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    job = ImportJob(filename=file.filename[:255], path=path, status=PENDING)
+    db.session.add(job)
+    db.session.commit()
+    worker = get_worker()
+    if worker is None:
+        fail_stale()
+        if _claim(job.id):
+            run_job(job.id)
+    else:
+        worker.notify()
+    return job
+
+
+def _claim(job_id: int) -> bool:
+    now = _utcnow()
+    claimed = db.session.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.status == PENDING)
+        .values(status=RUNNING, started_at=now, heartbeat_at=now)
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def fail_stale() -> int:
+    """Fail running jobs whose process stopped renewing their heartbeat.
+
+    A job's ``heartbeat_at`` is renewed at each of its commits; once it is
+    ``IMPORT_LEASE`` seconds old the process running the job is presumed
+    gone, e.g. restarted mid-import. The job is marked failed, keeping the
+    counters of the chunks it committed, and its upload is removed.
+    Returns the number of jobs failed.
+    """
+    app = current_app._get_current_object()
+    now = _utcnow()
+    stale = (
+        ImportJob.status == RUNNING,
+        ImportJob.heartbeat_at
+        < now - timedelta(seconds=app.config.get("IMPORT_LEASE", 900)),
+        # Jobs running in this process are alive whatever their heartbeat.
+        ImportJob.id.notin_(list(_progress_registry(app))),
+    )
+    candidates = db.session.execute(
+        select(ImportJob.id, ImportJob.path).where(*stale)
+    ).all()
+    failed = []
+    for job_id, path in candidates:
+        result = db.session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, *stale)
+            .values(
+                status=FAILED, message="Import interrupted", finished_at=now
+            )
+        )
+        if result.rowcount:
+            failed.append(path)
+    db.session.commit()
+    for path in failed:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(failed)
+
+
+def run_next() -> bool:
+    """Run the oldest pending job; return ``False`` if there was none."""
+    fail_stale()
+    for job_id in db.session.scalars(
+        select(ImportJob.id)
+        .where(ImportJob.status == PENDING)
+        .order_by(ImportJob.id)
+    ).all():
+        if _claim(job_id):
+            run_job(job_id)
+            return True
+    return False
+
+
+def run_job(job_id: int) -> None:
+    """Import the file of claimed job ``job_id`` and record the outcome.
+
+    The services are committed every ``IMPORT_COMMIT_EVERY`` rows, with
+    the job's counters, so the write lock is released regularly; ``0``
+    imports the whole file in one transaction. On failure the rows since
+    the last commit are rolled back and the job is marked failed, keeping
+    the counters of what was committed. Each commit renews the job's
+    heartbeat; see :func:`fail_stale`.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    progress = Progress()
+    registry = _progress_registry(app)
+    registry[job_id] = progress
+    job = db.session.get(ImportJob, job_id)
+    importer = ServiceImporter(
+        db.session, config.get("IMPORT_BATCH_SIZE", 1000)
+    )
+    commit_every = config.get("IMPORT_COMMIT_EVERY", 0)
+    max_errors = config.get("IMPORT_MAX_ERRORS", 10000)
+    # Row errors are collected here rather than by import_csv so that those
+    # of committed rows survive a failure.
+    errors: List[str] = []
+    # Counters and number of kept errors as of the last commit.
+    saved = Progress()
+    saved_errors = 0
+
+    def record(counters: Progress) -> None:
+        job.rows = counters.rows
+        job.inserted = counters.inserted
+        job.updated = counters.updated
+        job.error_count = counters.error_count
+
+    def add(row, line_num):
+        nonlocal saved_errors
+        error = importer.add(row, line_num)
+        progress.rows += 1
+        progress.inserted = importer.inserted
+        progress.updated = importer.updated
+        if error:
+            progress.error_count += 1
+            if len(errors) < max_errors:
+                errors.append(error)
+        if commit_every and progress.rows - saved.rows >= commit_every:
+            importer.flush()
+            progress.inserted = importer.inserted
+            progress.updated = importer.updated
+            record(progress)
+            job.heartbeat_at = _utcnow()
+            db.session.commit()
+            for name in ("rows", "inserted", "updated", "error_count"):
+                setattr(saved, name, getattr(progress, name))
+            saved_errors = len(errors)
+        return None
+
+    status, message = DONE, None
+    try:
+        with open(job.path, "rb") as upload:
+            stream = open_text(
+                upload,
+                config.get("IMPORT_MAX_BYTES", 0),
+                config.get("IMPORT_FALLBACK_ENCODING", "cp1251"),
+            )
+            header_errors = import_csv(stream, [validate_columns], add)
+            importer.flush()
+            progress.inserted = importer.inserted
+            progress.updated = importer.updated
+        if header_errors:
+            # The header was rejected, so no row was read.
+            status, message = FAILED, header_errors[0]
+    except FileTooLarge as exc:
+        status, message = FAILED, f"File is larger than {exc.max_bytes} bytes"
+    except (UnicodeDecodeError, csv.Error):
+        status, message = FAILED, "Invalid CSV"
+    except Exception:
+        app.logger.exception("Import job %s failed", job_id)
+        status, message = FAILED, "Import failed"
+    try:
+        if status == FAILED:
+            # Rows after the last commit are rolled back; report only what
+            # was committed.
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            record(saved)
+            del errors[saved_errors:]
+        else:
+            record(progress)
+        job.status = status
+        job.message = message
+        job.errors = "\n".join(errors) or None
+        job.finished_at = _utcnow()
+        db.session.commit()
+    finally:
+        registry.pop(job_id, None)
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+
+
+def job_status(job: ImportJob) -> dict:
+    """Return the state and counters of ``job``, live while it runs."""
+    progress = _progress_registry(current_app).get(job.id)
+    if progress is not None:
+        elapsed = time.monotonic() - progress.started
+        counters = progress
+    else:
+        end = job.finished_at or _utcnow()
+        elapsed = (
+            (end - job.started_at).total_seconds() if job.started_at else 0
+        )
+        counters = job
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "state": job.status,
+        "message": job.message,
+        "rows": counters.rows,
+        "inserted": counters.inserted,
+        "updated": counters.updated,
+        "errors": counters.error_count,
+        "elapsed": round(elapsed, 1),
+        "rows_per_second": round(counters.rows / elapsed) if elapsed else 0,
+    }
+
+
+class ImportWorker:
+    """Daemon threads running the pending import jobs of one application."""
+
+    def __init__(self, app: Flask, threads: int):
+        self.app = app
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"import-{i}", daemon=True
+            )
+            for i in range(threads)
+        ]
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopped.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    while run_next() and not self._stopped.is_set():
+                        pass
+                except Exception:
+                    self.app.logger.exception("Import worker failed")
+                finally:
+                    db.session.remove()
+
+
+def get_worker() -> Optional[ImportWorker]:
+    """Return the in-process worker, starting it on first use.
+
+    ``IMPORT_WORKERS = 0`` disables it and imports run in the request.
+    """
+    app = current_app._get_current_object()
+    threads = app.config.get("IMPORT_WORKERS", 1)
+    if not threads:
+        return None
+    worker = app.extensions.get("import_worker")
+    if worker is None:
+        with _worker_lock:
+            worker = app.extensions.get("import_worker")
+            if worker is None:
+                worker = ImportWorker(app, threads)
+                worker.start()
+                app.extensions["import_worker"] = worker
+    return worker
@@ -0,0 +1,213 @@
+import decimal
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from .changes import UPSERT, record_changes
+from .models import Category, Service, UnitOfMeasurement
+
+REQUIRED_COLUMNS = {"name", "price", "category", "unit"}
+
+CENT = decimal.Decimal("0.01")
+
+# A service is either an existing row id or a row pending insertion.
+_Target = Union[int, dict]
+
+
+def validate_columns(fieldnames) -> Optional[str]:
+    if not fieldnames or not REQUIRED_COLUMNS.issubset(fieldnames):
+        return "Missing columns"
+    return None
+
+
+def _clean(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+class ServiceImporter:
+    """Upsert services from CSV rows with batched statements.
+
+    The ids and lowercased names of all services, categories and units are
+    loaded up front, so a row is matched without querying. Rows are
+    collected and written every ``batch_size`` rows by :meth:`flush`: one
+    set-based insert for missing categories and units, then one
+    ``executemany`` update and one insert for services. The change log is
+    written explicitly since these statements bypass the unit of work.
+
+    A row with an ``id`` of an existing service updates it, including its
+    name; otherwise the service with the same name, ignoring case, has its
+    price, category and unit updated, or a new service is created.
+    """
+
+    def __init__(self, session: Session, batch_size: int = 1000):
+        self.session = session
+        self.batch_size = batch_size
+        self.names: Dict[int, str] = {}
+        self.by_name: Dict[str, _Target] = {}
+        for sid, name in session.execute(
+            select(Service.id, Service.name).order_by(Service.id)
+        ):
+            key = name.lower()
+            self.names[sid] = key
+            self.by_name.setdefault(key, sid)
+        self.categories = self._index(Category.id, Category.name)
+        self.units = self._index(
+            UnitOfMeasurement.id, UnitOfMeasurement.abbreviation
+        )
+        self.new_categories: Dict[str, str] = {}
+        self.new_units: Dict[str, str] = {}
+        self.inserts: List[dict] = []
+        self.updates: Dict[int, dict] = {}
+        self.inserted = 0
+        self.updated = 0
+
+    def _index(self, id_column, name_column) -> Dict[str, int]:
+        return {
+            name.lower(): rid
+            for rid, name in self.session.execute(
+                select(id_column, name_column)
+            )
+        }
+
+    def _related(self, name: str, index: dict, new: dict) -> Optional[str]:
+        if not name:
+            return None
+        key = name.lower()
+        if key not in index:
+            new.setdefault(key, name)
+        return key
+
+    def add(self, row: dict, line_num: int) -> Optional[str]:
+        """Queue ``row``; return an error message if it is invalid."""
+        svc_id = _clean(row.get("id"))
+        name = _clean(row.get("name"))
+        price = row.get("price")
+        if not name or not price:
+            return f"Row {line_num}: Missing data"
+        try:
+            price = decimal.Decimal(price).quantize(CENT)
+        except decimal.InvalidOperation:
+            return f"Row {line_num}: Invalid price"
+        if svc_id:
+            try:
+                svc_id = int(svc_id)
+            except ValueError:
+                return f"Row {line_num}: Invalid id"
+
+        values = {
+            "price": price,
+            "category": self._related(
+                _clean(row.get("category")),
+                self.categories,
+                self.new_categories,
+            ),
+            "unit": self._related(
+                _clean(row.get("unit")), self.units, self.new_units
+            ),
+        }
+        key = name.lower()
+        if svc_id in self.names:
+            old = self.names[svc_id]
+            if self.by_name.get(old) == svc_id:
+                del self.by_name[old]
+            self.names[svc_id] = key
+            self.by_name.setdefault(key, svc_id)
+            values["name"] = name
+            self.updates.setdefault(svc_id, {}).update(values)
+        else:
+            target = self.by_name.get(key)
+            if target is None:
+                values["name"] = name
+                self.inserts.append(values)
+                self.by_name[key] = values
+            elif isinstance(target, dict):
+                target.update(values)
+            else:
+                self.updates.setdefault(target, {}).update(values)
+        if len(self.inserts) + len(self.updates) >= self.batch_size:
+            self.flush()
+        return None
+
+    def _insert(self, table, key_column, rows: List[dict]):
+        """Insert ``rows``; return ``(id, key)`` pairs in any order.
+
+        SQLite does not promise that ``RETURNING`` follows the order of a
+        multi-row ``INSERT``, so rows are matched back by a unique key
+        rather than by position, which would force one statement per row.
+        """
+        return self.session.execute(
+            insert(table).returning(table.c.id, table.c[key_column]), rows
+        ).all()
+
+    def _create(self, key_column, model, new: dict, index: dict) -> None:
+        """Insert ``new`` categories or units and add them to ``index``.
+
+        The name is stored in every string column; units get it as both
+        name and abbreviation, and are matched by the latter.
+        """
+        if not new:
+            return
+        table = model.__table__
+        columns = [c.name for c in table.columns if c.name != "id"]
+        inserted = self._insert(
+            table,
+            key_column,
+            [dict.fromkeys(columns, name) for name in new.values()],
+        )
+        for rid, name in inserted:
+            index[name.lower()] = rid
+        ids = [rid for rid, _ in inserted]
+        record_changes(self.session, model, ids, UPSERT)
+        new.clear()
+
+    def _resolve(self, values: dict) -> dict:
+        row = {
+            "price": values["price"],
+            "category_id": self.categories.get(values["category"]),
+            "unit_id": self.units.get(values["unit"]),
+        }
+        if "name" in values:
+            row["name"] = values["name"]
+        return row
+
+    def flush(self) -> None:
+        """Write the queued rows."""
+        self._create(
+            "name", Category, self.new_categories, self.categories
+        )
+        self._create(
+            "abbreviation", UnitOfMeasurement, self.new_units, self.units
+        )
+        table = Service.__table__
+        if self.updates:
+            # Rows renamed by id carry a name; group them by column set so
+            # each executemany shares one statement.
+            groups: Dict[bool, List[dict]] = {}
+            for sid, values in self.updates.items():
+                row = self._resolve(values)
+                row["b_id"] = sid
+                groups.setdefault("name" in row, []).append(row)
+            for rows in groups.values():
+                self.session.execute(
+                    update(table).where(table.c.id == bindparam("b_id")),
+                    rows,
+                )
+            record_changes(self.session, Service, self.updates, UPSERT)
+            self.updated += len(self.updates)
+            self.updates.clear()
+        if self.inserts:
+            inserted = self._insert(
+                table,
+                "name",
+                [self._resolve(values) for values in self.inserts],
+            )
+            ids = []
+            for sid, name in inserted:
+                key = name.lower()
+                self.names[sid] = key
+                self.by_name[key] = sid
+                ids.append(sid)
+            record_changes(self.session, Service, ids, UPSERT)
+            self.inserted += len(ids)
+            self.inserts.clear()
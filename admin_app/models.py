@@ -1,3 +1,5 @@
+import uuid
+
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -43,15 +45,24 @@ class Category(db.Model):
 
 
 class Service(db.Model):
+    __table_args__ = (
+        # Serves case-insensitive lookups by ``func.lower(Service.name)``.
+        db.Index('ix_service_name_lower', db.func.lower(db.text('name'))),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(64), nullable=False)
+    name = db.Column(db.String(64), nullable=False, index=True)
     price = db.Column(db.Numeric(10, 2), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    category_id = db.Column(
+        db.Integer, db.ForeignKey('category.id'), index=True
+    )
     category = db.relationship(
         'Category',
         backref=db.backref('services', lazy=True),
     )
-    unit_id = db.Column(db.Integer, db.ForeignKey('unit_of_measurement.id'))
+    unit_id = db.Column(
+        db.Integer, db.ForeignKey('unit_of_measurement.id'), index=True
+    )
     unit = db.relationship('UnitOfMeasurement')
 
     def __repr__(self):
@@ -67,6 +78,80 @@ class Setting(db.Model):
         return f"<Setting {self.key}>"
 
 
+class CatalogChange(db.Model):
+    """Change log entry; its id doubles as the catalog version."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(16), nullable=False)
+    entity_id = db.Column(db.String(64), nullable=False)
+    op = db.Column(db.String(8), nullable=False)
+    created_at = db.Column(
+        db.DateTime, nullable=False, server_default=db.func.current_timestamp()
+    )
+
+    def __repr__(self):
+        return f"<CatalogChange {self.id} {self.op} {self.entity}>"
+
+
+class OutboxMessage(db.Model):
+    """Email waiting for, or done with, background delivery."""
+
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Public id of the message; ``id`` is sequential and easy to guess.
+    token = db.Column(
+        db.String(32),
+        nullable=False,
+        unique=True,
+        index=True,
+        default=lambda: uuid.uuid4().hex,
+    )
+    recipient = db.Column(db.String(254), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False)
+    last_error = db.Column(db.String(256))
+    error_code = db.Column(db.String(32))
+    created_at = db.Column(
+        db.DateTime, nullable=False, server_default=db.func.current_timestamp()
+    )
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} {self.status}>"
+
+
+class ImportJob(db.Model):
+    """Services CSV upload imported in the background."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    path = db.Column(db.String(512), nullable=False)
+    status = db.Column(
+        db.String(16), nullable=False, default='pending', index=True
+    )
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    inserted = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)
+    message = db.Column(db.String(256))
+    created_at = db.Column(
+        db.DateTime, nullable=False, server_default=db.func.current_timestamp()
+    )
+    started_at = db.Column(db.DateTime)
+    # Renewed at every commit of a running job; see ``IMPORT_LEASE``.
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.status}>"
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
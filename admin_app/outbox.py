@@ -0,0 +1,291 @@
+import email
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email import policy
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+
+from flask import Flask, current_app
+from sqlalchemy import select, update
+
+from . import db
+from .models import OutboxMessage
+from .smtp_pool import get_smtp_pool
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+_worker_lock = threading.Lock()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue(message: EmailMessage) -> OutboxMessage:
+    """Store ``message`` for background delivery and wake the worker."""
+    entry = OutboxMessage(
+        recipient=message["To"],
+        message=message.as_string(),
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=_utcnow(),
+    )
+    db.session.add(entry)
+    db.session.commit()
+    worker = get_worker()
+    if worker is not None:
+        worker.notify()
+    return entry
+
+
+def retry_delay(attempts: int) -> float:
+    """Return the backoff in seconds after ``attempts`` failed tries."""
+    config = current_app.config
+    delay = config.get("OUTBOX_RETRY_BASE", 30) * 2 ** max(attempts - 1, 0)
+    return min(delay, config.get("OUTBOX_RETRY_MAX", 3600))
+
+
+def _lease_end(now: datetime) -> datetime:
+    return now + timedelta(
+        seconds=current_app.config.get("OUTBOX_LEASE", 300)
+    )
+
+
+def _claim(limit: int) -> Tuple[List[int], datetime]:
+    """Lease up to ``limit`` due messages to this worker.
+
+    A claimed message is moved to ``sending`` with its next attempt pushed
+    ``OUTBOX_LEASE`` seconds ahead, so a worker that dies mid-delivery
+    only delays the message instead of losing it. The conditional update
+    keeps two workers from claiming the same row. Returns the claimed ids
+    and the end of their lease.
+    """
+    now = _utcnow()
+    lease = _lease_end(now)
+    due = (
+        OutboxMessage.status.in_([PENDING, SENDING]),
+        OutboxMessage.next_attempt_at <= now,
+    )
+    candidates = db.session.execute(
+        select(OutboxMessage.id)
+        .where(*due)
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(limit)
+    ).scalars().all()
+    claimed = []
+    for message_id in candidates:
+        result = db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id, *due)
+            .values(status=SENDING, next_attempt_at=lease)
+        )
+        if result.rowcount:
+            claimed.append(message_id)
+    db.session.commit()
+    return claimed, lease
+
+
+def _renew(ids: List[int], lease: datetime) -> Tuple[int, datetime]:
+    """Extend the lease of messages ``ids`` that still hold ``lease``.
+
+    Returns how many were renewed, fewer when the lease of some expired
+    and another worker claimed them, and the new end of the lease.
+    """
+    renewed_until = _lease_end(_utcnow())
+    renewed = db.session.execute(
+        update(OutboxMessage)
+        .where(
+            OutboxMessage.id.in_(ids),
+            OutboxMessage.status == SENDING,
+            OutboxMessage.next_attempt_at == lease,
+        )
+        .values(next_attempt_at=renewed_until),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    return renewed, renewed_until
+
+
+def error_code(exc: Exception) -> str:
+    """Return the category of delivery error ``exc`` shown to clients.
+
+    The exception text may quote recipients and relay replies, so it is
+    only kept in ``last_error`` for operators.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return "recipient_refused"
+    if isinstance(
+        exc, (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected)
+    ):
+        return "server_unavailable"
+    if isinstance(exc, smtplib.SMTPException):
+        return "delivery_failed"
+    if isinstance(exc, OSError):
+        return "server_unavailable"
+    return "delivery_failed"
+
+
+def _record_failure(entry: OutboxMessage, exc: Exception) -> None:
+    entry.last_error = str(exc)[:256] or type(exc).__name__
+    entry.error_code = error_code(exc)
+    max_attempts = current_app.config.get("OUTBOX_MAX_ATTEMPTS", 8)
+    if (
+        isinstance(exc, smtplib.SMTPRecipientsRefused)
+        or entry.attempts >= max_attempts
+    ):
+        entry.status = FAILED
+        return
+    entry.status = PENDING
+    entry.next_attempt_at = _utcnow() + timedelta(
+        seconds=retry_delay(entry.attempts)
+    )
+
+
+def deliver_due(limit: int = 100) -> int:
+    """Try to deliver up to ``limit`` due messages over one SMTP session.
+
+    The outcome of each message is committed as soon as the server has
+    answered, and the lease of the rest of the batch is renewed, so a
+    slow batch or a crash never has a delivered message sent again. The
+    batch stops early if another worker took over some of its messages.
+    Failed messages are retried with exponential backoff until
+    ``OUTBOX_MAX_ATTEMPTS`` is reached. Returns the number of messages
+    processed, whatever their outcome.
+    """
+    claimed, lease = _claim(limit)
+    if not claimed:
+        return 0
+    entries = (
+        OutboxMessage.query.filter(OutboxMessage.id.in_(claimed))
+        .order_by(OutboxMessage.id)
+        .all()
+    )
+    ids = [entry.id for entry in entries]
+
+    def record(index: int, error: Optional[Exception]) -> bool:
+        nonlocal lease
+        entry = entries[index]
+        entry.attempts += 1
+        if error is None:
+            entry.status = SENT
+            entry.sent_at = _utcnow()
+            entry.last_error = None
+            entry.error_code = None
+        else:
+            _record_failure(entry, error)
+        rest = ids[index + 1:]
+        renewed = 0
+        if rest:
+            renewed, lease = _renew(rest, lease)
+        db.session.commit()
+        return renewed == len(rest)
+
+    results = get_smtp_pool().send_many(
+        [
+            email.message_from_string(entry.message, policy=policy.default)
+            for entry in entries
+        ],
+        on_result=record,
+    )
+    return len(results)
+
+
+class OutboxWorker:
+    """Daemon threads delivering the outbox of one application.
+
+    Threads wake up when a message is enqueued and otherwise poll every
+    ``interval`` seconds so retries become due without new traffic.
+    """
+
+    def __init__(self, app: Flask, threads: int, interval: float):
+        self.app = app
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"outbox-{i}", daemon=True
+            )
+            for i in range(threads)
+        ]
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopped.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    while deliver_due() and not self._stopped.is_set():
+                        pass
+                except Exception:
+                    self.app.logger.exception("Outbox delivery failed")
+                finally:
+                    db.session.remove()
+
+
+def get_worker() -> Optional[OutboxWorker]:
+    """Return the in-process worker, starting it on first use.
+
+    ``OUTBOX_WORKERS = 0`` disables it; run ``flask outbox-worker`` instead.
+    """
+    app = current_app._get_current_object()
+    threads = app.config.get("OUTBOX_WORKERS", 1)
+    if not threads:
+        return None
+    worker = app.extensions.get("outbox_worker")
+    if worker is None:
+        with _worker_lock:
+            worker = app.extensions.get("outbox_worker")
+            if worker is None:
+                worker = OutboxWorker(
+                    app,
+                    threads,
+                    app.config.get("OUTBOX_POLL_INTERVAL", 5),
+                )
+                worker.start()
+                app.extensions["outbox_worker"] = worker
+    return worker
+
+
+def run_worker(interval: float, once: bool = False) -> None:
+    """Deliver due messages in the foreground until interrupted."""
+    while True:
+        while deliver_due():
+            pass
+        db.session.remove()
+        if once:
+            return
+        time.sleep(interval)
+
+
+def status_of(entry: OutboxMessage) -> dict:
+    def iso(value):
+        return value.isoformat() + "Z" if value else None
+
+    return {
+        "message_id": entry.token,
+        "state": entry.status,
+        "attempts": entry.attempts,
+        "next_attempt_at": (
+            iso(entry.next_attempt_at) if entry.status == PENDING else None
+        ),
+        "sent_at": iso(entry.sent_at),
+        "error": entry.error_code,
+    }
@@ -0,0 +1,210 @@
+import io
+import json
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import select
+
+from . import db
+from .catalog import get_catalog_cache
+from .models import Service, UnitOfMeasurement
+
+ONE = Decimal(1)
+
+# Keeps line totals well within the default ``Decimal`` precision.
+MAX_QUANTITY = 10 ** 9
+
+PriceRow = Tuple[int, Decimal, str, Optional[str]]
+
+
+class QuoteError(ValueError):
+    """Raised when a quote request references bad data."""
+
+
+def format_cents(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+
+def parse_quantity(value):
+    """Return ``value`` as an ``int`` when exact, otherwise a ``Decimal``."""
+    if isinstance(value, bool):
+        raise QuoteError("quantity must be a number")
+    if isinstance(value, int):
+        quantity = value
+    else:
+        try:
+            quantity = Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            raise QuoteError("quantity must be a number")
+        if not quantity.is_finite():
+            raise QuoteError("quantity must be a non-negative number")
+    if quantity < 0:
+        raise QuoteError("quantity must be a non-negative number")
+    if quantity > MAX_QUANTITY:
+        raise QuoteError(f"quantity must be at most {MAX_QUANTITY}")
+    return quantity
+
+
+def parse_service_id(value) -> int:
+    if isinstance(value, bool):
+        raise QuoteError("service_id must be an integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise QuoteError("service_id must be an integer")
+
+
+class PriceTable:
+    """In-memory prices in integer cents keyed by service id.
+
+    Whole quantities are priced with integer multiplication; fractional
+    ones go through ``Decimal`` and are rounded half-up to a cent, so every
+    line total is exact.
+    """
+
+    def __init__(self, rows: Iterable[PriceRow]):
+        self.cents: Dict[int, int] = {}
+        self.price_text: Dict[int, str] = {}
+        self.names: Dict[int, str] = {}
+        self.units: Dict[int, Optional[str]] = {}
+        for service_id, price, name, unit in rows:
+            cents = int(Decimal(price).scaleb(2))
+            self.cents[service_id] = cents
+            self.price_text[service_id] = format_cents(cents)
+            self.names[service_id] = name
+            self.units[service_id] = unit
+
+    def line(self, service_id: int, quantity) -> Tuple[int, int]:
+        """Return ``(unit_cents, total_cents)`` for one quote line."""
+        try:
+            cents = self.cents[service_id]
+        except KeyError:
+            raise QuoteError(f"unknown service {service_id}")
+        if type(quantity) is int:
+            return cents, quantity * cents
+        try:
+            total = (quantity * cents).quantize(ONE, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise QuoteError("quantity is too large")
+        return cents, int(total)
+
+    def price(self, items, detailed: bool = True) -> dict:
+        """Price a list of ``{"service_id", "quantity"}`` items."""
+        if not isinstance(items, list) or not items:
+            raise QuoteError("items must be a non-empty list.")
+        lines = []
+        grand_total = 0
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                raise QuoteError(f"items[{i}]: must be an object")
+            service_id = item.get("service_id")
+            quantity = item.get("quantity")
+            try:
+                # JSON integers are by far the common case; skip parsing.
+                if type(service_id) is not int:
+                    service_id = parse_service_id(service_id)
+                if (
+                    type(quantity) is not int
+                    or not 0 <= quantity <= MAX_QUANTITY
+                ):
+                    quantity = parse_quantity(quantity)
+                cents, total = self.line(service_id, quantity)
+            except QuoteError as exc:
+                raise QuoteError(f"items[{i}]: {exc}")
+            grand_total += total
+            line = {
+                "service_id": service_id,
+                "quantity": (
+                    str(quantity)
+                    if type(quantity) is int
+                    else f"{quantity.normalize():f}"
+                ),
+                "unit": self.units[service_id],
+                "price_per_unit": self.price_text[service_id],
+                "item_total_price": format_cents(total),
+            }
+            if detailed:
+                line["name"] = self.names[service_id]
+            lines.append(line)
+        return {"items": lines, "grand_total_price": format_cents(grand_total)}
+
+
+def price_table() -> PriceTable:
+    """Return the :class:`PriceTable` for the current catalog version."""
+
+    def build() -> PriceTable:
+        return PriceTable(
+            db.session.execute(
+                select(
+                    Service.id,
+                    Service.price,
+                    Service.name,
+                    UnitOfMeasurement.abbreviation,
+                ).outerjoin(
+                    UnitOfMeasurement,
+                    UnitOfMeasurement.id == Service.unit_id,
+                )
+            )
+        )
+
+    return get_catalog_cache().get("price-table", build)
+
+
+def calculate_quote(items) -> dict:
+    """Price ``items`` exactly against the current catalog."""
+    return price_table().price(items)
+
+
+def iter_ndjson(body: bytes) -> Iterator:
+    """Yield one decoded object per non-blank line of ``body``.
+
+    Lines that are not valid JSON are yielded as :class:`QuoteError`.
+    """
+    for number, line in enumerate(io.BytesIO(body), 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield QuoteError(f"line {number}: invalid JSON")
+
+
+def iter_batch_results(
+    table: PriceTable, quotes: Iterable, max_quotes: int, max_items: int
+) -> Iterator[str]:
+    """Price ``quotes`` one by one, yielding an NDJSON line for each.
+
+    A quote that fails only produces an ``error`` line for itself. The
+    batch stops with a final error line once it exceeds ``max_quotes``
+    quotes or ``max_items`` line items in total.
+    """
+    items_seen = 0
+    for count, quote in enumerate(quotes, 1):
+        if count > max_quotes:
+            yield _line({"error": f"batch limited to {max_quotes} quotes"})
+            return
+        if isinstance(quote, QuoteError):
+            yield _line({"id": None, "error": str(quote)})
+            continue
+        if not isinstance(quote, dict):
+            yield _line({"id": None, "error": "quote must be an object"})
+            continue
+        items = quote.get("items")
+        if isinstance(items, list):
+            items_seen += len(items)
+            if items_seen > max_items:
+                yield _line(
+                    {"error": f"batch limited to {max_items} line items"}
+                )
+                return
+        try:
+            result = table.price(items, detailed=False)
+        except QuoteError as exc:
+            result = {"error": str(exc)}
+        yield _line({"id": quote.get("id"), **result})
+
+
+def _line(data: dict) -> str:
+    return json.dumps(data, separators=(",", ":")) + "\n"
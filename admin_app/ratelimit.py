@@ -0,0 +1,224 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Tuple
+
+from flask import current_app, jsonify, request
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+LIMIT_RE = re.compile(
+    r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$"
+)
+
+_init_lock = threading.Lock()
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """Parse ``"10/minute"`` or ``"100/5minutes"`` into ``(burst, rate)``.
+
+    ``burst`` is the number of requests allowed at once and ``rate`` the
+    number of tokens refilled per second.
+    """
+    match = LIMIT_RE.match(value)
+    if match is None:
+        raise ValueError(f"invalid rate limit: {value!r}")
+    count = int(match.group(1))
+    period = int(match.group(2) or 1) * PERIODS[match.group(3)]
+    if count < 1:
+        raise ValueError(f"invalid rate limit: {value!r}")
+    return count, count / period
+
+
+class MemoryBackend:
+    """Token buckets for one process, at most ``max_keys`` of them.
+
+    Buckets live in an ``OrderedDict`` kept in least-recently-used order;
+    the oldest one is dropped when the limit is reached. A dropped bucket
+    had been idle the longest and would most likely have refilled anyway.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, burst: int, rate: float) -> float:
+        now = time.monotonic()
+        buckets = self._buckets
+        with self._lock:
+            state = buckets.get(key)
+            if state is None:
+                buckets[key] = [burst - 1.0, now]
+                if len(buckets) > self.max_keys:
+                    buckets.popitem(last=False)
+                return 0.0
+            buckets.move_to_end(key)
+            tokens = min(burst, state[0] + (now - state[1]) * rate)
+            state[1] = now
+            if tokens >= 1:
+                state[0] = tokens - 1
+                return 0.0
+            state[0] = tokens
+            return (1 - tokens) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """Token buckets in a SQLite file shared by all worker processes.
+
+    Each bucket records when it will be full again; rows past that point
+    are equivalent to a missing row and are purged every
+    ``purge_every`` hits.
+    """
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._hits = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, burst: int, rate: float) -> float:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_limit WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                tokens = float(burst)
+            else:
+                tokens = min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit "
+                "(key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            self._hits += 1
+            if self._hits % self.purge_every == 0:
+                conn.execute(
+                    "DELETE FROM rate_limit WHERE full_at < ?", (now,)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM rate_limit")
+
+
+class RateLimiter:
+    """Named limits such as ``"send-ip"`` checked against one backend."""
+
+    def __init__(self, backend, limits: Dict[str, str], enabled=True):
+        self.backend = backend
+        self.enabled = enabled
+        self.limits = {
+            name: parse_limit(value)
+            for name, value in limits.items()
+            if value
+        }
+
+    def hit(self, name: str, value: str) -> float:
+        """Consume one token for ``value`` under limit ``name``.
+
+        Returns ``0`` when the request is allowed, otherwise the number of
+        seconds until it would be.
+        """
+        limit = self.limits.get(name)
+        if not self.enabled or limit is None:
+            return 0.0
+        return self.backend.hit(f"{name}:{value}", *limit)
+
+
+def _create_limiter(app) -> RateLimiter:
+    config = app.config
+    storage = config.get("RATELIMIT_STORAGE_URL") or "memory://"
+    if storage.startswith("sqlite:///"):
+        backend = SQLiteBackend(storage[len("sqlite:///"):])
+    elif storage == "memory://":
+        backend = MemoryBackend(config.get("RATELIMIT_MAX_KEYS", 10000))
+    else:
+        raise ValueError(f"unsupported rate limit storage: {storage!r}")
+    return RateLimiter(
+        backend,
+        {
+            "send-ip": config.get("RATELIMIT_SEND_PER_IP"),
+            "send-email": config.get("RATELIMIT_SEND_PER_EMAIL"),
+            "data-ip": config.get("RATELIMIT_DATA_PER_IP"),
+        },
+        enabled=config.get("RATELIMIT_ENABLED", True),
+    )
+
+
+def get_limiter() -> RateLimiter:
+    """Return the application's limiter, created from its current config."""
+    app = current_app._get_current_object()
+    limiter = app.extensions.get("rate_limiter")
+    if limiter is None:
+        with _init_lock:
+            limiter = app.extensions.get("rate_limiter")
+            if limiter is None:
+                limiter = _create_limiter(app)
+                app.extensions["rate_limiter"] = limiter
+    return limiter
+
+
+def too_many_requests(retry_after: float, body: dict):
+    response = jsonify(body)
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def check_limit(name: str, value: str, body: dict):
+    """Return a 429 response when ``value`` exceeded limit ``name``."""
+    wait = get_limiter().hit(name, value)
+    if wait:
+        return too_many_requests(wait, body)
+    return None
+
+
+def limit_by_ip(name: str, body: dict) -> Callable:
+    """Apply limit ``name`` per client address to a view."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = check_limit(name, request.remote_addr or "", body)
+            if response is not None:
+                return response
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -8,14 +8,21 @@ from flask import (
     send_from_directory,
     current_app,
     Response,
+    jsonify,
+    stream_with_context,
 )
 from flask_login import login_user, logout_user, login_required, current_user
 
 from . import db
-from sqlalchemy import func
-import io
-import decimal
-from .utils.io import export_csv, import_csv
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import joinedload
+from .catalog import row_count, stream_rows
+from .changes import DELETE, UPSERT, chunked, record_changes
+from .idempotency import get_store
+from .import_jobs import job_status, submit
+from .search import search_services
+from .utils.io import FileTooLarge, gzip_stream, iter_csv
+from .utils.pagination import paginate
 from .forms import (
     LoginForm,
     UnitForm,
@@ -30,6 +37,7 @@ from .models import (
     Category,
     Service,
     Setting,
+    ImportJob,
 )
 
 import os
@@ -63,6 +71,117 @@ def index():
     return redirect(url_for('admin.units'))
 
 
+@admin_bp.route('/stats/idempotency')
+@login_required
+def idempotency_stats():
+    return jsonify(get_store().stats())
+
+
+SORT_COLUMNS = {
+    UnitOfMeasurement: {
+        'id': UnitOfMeasurement.id,
+        'name': UnitOfMeasurement.name,
+        'abbreviation': UnitOfMeasurement.abbreviation,
+    },
+    Category: {'id': Category.id, 'name': Category.name},
+    Service: {'id': Service.id, 'name': Service.name},
+}
+
+
+# Loaded with every listed service, which the templates read per row.
+SERVICE_RELATIONS = (joinedload(Service.category), joinedload(Service.unit))
+
+
+def _list_page(model, *options):
+    """Return the page of ``model`` rows selected by the request args."""
+    return paginate(
+        model.query.options(*options),
+        SORT_COLUMNS[model],
+        request.args.get('sort'),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=current_app.config.get('ADMIN_PAGE_SIZE', 50),
+        total=row_count(model),
+    )
+
+
+# Services referencing a deleted row are kept and detached from it.
+SERVICE_REFERENCES = {
+    Category: Service.__table__.c.category_id,
+    UnitOfMeasurement: Service.__table__.c.unit_id,
+}
+
+
+def _selected_ids(field):
+    ids = set()
+    for value in request.form.getlist(field):
+        try:
+            ids.add(int(value))
+        except ValueError:
+            pass
+    return sorted(ids)
+
+
+def _delete_selected(model, ids):
+    """Delete the ``model`` rows with ``ids``; return how many existed.
+
+    Rows are removed with one ``DELETE ... WHERE id IN (...)`` per chunk
+    of ids instead of loading and deleting each object, so the change log
+    is written explicitly.
+    """
+    table = model.__table__
+    services = Service.__table__
+    reference = SERVICE_REFERENCES.get(model)
+    deleted = 0
+    for chunk in chunked(ids):
+        found = db.session.scalars(
+            select(table.c.id).where(table.c.id.in_(chunk))
+        ).all()
+        if not found:
+            continue
+        if reference is not None:
+            detached = db.session.scalars(
+                select(services.c.id).where(reference.in_(found))
+            ).all()
+            for part in chunked(detached):
+                db.session.execute(
+                    update(services)
+                    .where(services.c.id.in_(part))
+                    .values({reference.name: None})
+                )
+            record_changes(db.session, Service, detached, UPSERT)
+        db.session.execute(delete(table).where(table.c.id.in_(found)))
+        record_changes(db.session, model, found, DELETE)
+        deleted += len(found)
+    db.session.commit()
+    return deleted
+
+
+def _csv_response(statement, columns, filename):
+    """Stream the rows of ``statement`` as a CSV attachment.
+
+    Rows are fetched in batches while the response is written, and the
+    body is gzipped on the fly when the client accepts it.
+    """
+
+    def rows():
+        yield from stream_rows(statement)
+
+    chunks = (chunk.encode('utf-8') for chunk in iter_csv(rows(), columns))
+    level = current_app.config.get('EXPORT_GZIP_LEVEL', 6)
+    encoding = request.accept_encodings.best_match(['gzip']) if level else None
+    if encoding:
+        chunks = gzip_stream(chunks, level)
+    response = Response(stream_with_context(chunks), mimetype='text/csv')
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename={filename}'
+    )
+    return response
+
+
 @admin_bp.route('/calculator/')
 def calculator_widget_page():
     widget_dir = os.path.join(
@@ -96,8 +215,14 @@ def units():
         db.session.add(unit)
         db.session.commit()
         return redirect(url_for('admin.units'))
-    units = UnitOfMeasurement.query.all()
-    return render_template('units.html', form=form, delete_form=delete_form, units=units)
+    page = _list_page(UnitOfMeasurement)
+    return render_template(
+        'units.html',
+        form=form,
+        delete_form=delete_form,
+        units=page.items,
+        page=page,
+    )
 
 
 @admin_bp.route('/units/edit/<int:unit_id>', methods=['GET', 'POST'])
@@ -110,11 +235,13 @@ def edit_unit(unit_id):
         form.populate_obj(unit)
         db.session.commit()
         return redirect(url_for('admin.units'))
+    page = _list_page(UnitOfMeasurement)
     return render_template(
         'units.html',
         form=form,
         delete_form=delete_form,
-        units=UnitOfMeasurement.query.all(),
+        units=page.items,
+        page=page,
     )
 
 
@@ -130,29 +257,26 @@ def delete_unit(unit_id):
 @admin_bp.route('/units/delete-selected', methods=['POST'])
 @login_required
 def delete_selected_units():
-    ids = request.form.getlist('unit_ids')
-    for uid in ids:
-        unit = db.session.get(UnitOfMeasurement, uid)
-        if unit:
-            db.session.delete(unit)
+    ids = _selected_ids('unit_ids')
     if ids:
-        db.session.commit()
+        count = _delete_selected(UnitOfMeasurement, ids)
+        flash(f'Deleted {count} units')
     return redirect(url_for('admin.units'))
 
 
 @admin_bp.route('/units/export')
 @login_required
 def export_units():
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['name', 'abbreviation'])
-    for unit in UnitOfMeasurement.query.all():
-        writer.writerow([unit.name, unit.abbreviation])
-    response = Response(output.getvalue(), mimetype='text/csv')
-    response.headers['Content-Disposition'] = (
-        'attachment; filename=units.csv'
+    return _csv_response(
+        select(
+            UnitOfMeasurement.name, UnitOfMeasurement.abbreviation
+        ).order_by(UnitOfMeasurement.id),
+        [
+            ('name', lambda u: u.name),
+            ('abbreviation', lambda u: u.abbreviation),
+        ],
+        'units.csv',
     )
-    return response
 
 
 @admin_bp.route('/categories', methods=['GET', 'POST'])
@@ -165,8 +289,14 @@ def categories():
         db.session.add(category)
         db.session.commit()
         return redirect(url_for('admin.categories'))
-    categories = Category.query.all()
-    return render_template('categories.html', form=form, delete_form=delete_form, categories=categories)
+    page = _list_page(Category)
+    return render_template(
+        'categories.html',
+        form=form,
+        delete_form=delete_form,
+        categories=page.items,
+        page=page,
+    )
 
 
 @admin_bp.route('/categories/edit/<int:category_id>', methods=['GET', 'POST'])
@@ -179,11 +309,13 @@ def edit_category(category_id):
         form.populate_obj(category)
         db.session.commit()
         return redirect(url_for('admin.categories'))
+    page = _list_page(Category)
     return render_template(
         'categories.html',
         form=form,
         delete_form=delete_form,
-        categories=Category.query.all(),
+        categories=page.items,
+        page=page,
     )
 
 
@@ -199,29 +331,21 @@ def delete_category(category_id):
 @admin_bp.route('/categories/delete-selected', methods=['POST'])
 @login_required
 def delete_selected_categories():
-    ids = request.form.getlist('category_ids')
-    for cid in ids:
-        category = db.session.get(Category, cid)
-        if category:
-            db.session.delete(category)
+    ids = _selected_ids('category_ids')
     if ids:
-        db.session.commit()
+        count = _delete_selected(Category, ids)
+        flash(f'Deleted {count} categories')
     return redirect(url_for('admin.categories'))
 
 
 @admin_bp.route('/categories/export')
 @login_required
 def export_categories():
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['name'])
-    for category in Category.query.all():
-        writer.writerow([category.name])
-    response = Response(output.getvalue(), mimetype='text/csv')
-    response.headers['Content-Disposition'] = (
-        'attachment; filename=categories.csv'
+    return _csv_response(
+        select(Category.name).order_by(Category.id),
+        [('name', lambda c: c.name)],
+        'categories.csv',
     )
-    return response
 
 
 @admin_bp.route('/services', methods=['GET', 'POST'])
@@ -245,15 +369,50 @@ def services():
         db.session.add(service)
         db.session.commit()
         return redirect(url_for('admin.services'))
-    services = Service.query.all()
+    query = request.args.get('q', '').strip()
+    page = None
+    if query:
+        services = _search_service_objects(query)
+    else:
+        page = _list_page(Service, *SERVICE_RELATIONS)
+        services = page.items
     return render_template(
         'services.html',
         form=form,
         delete_form=delete_form,
         services=services,
+        page=page,
+        query=query,
+        imports=_recent_imports(),
     )
 
 
+ADMIN_SEARCH_LIMIT = 200
+RECENT_IMPORTS = 5
+
+
+def _recent_imports():
+    return [
+        job_status(job)
+        for job in ImportJob.query.order_by(ImportJob.id.desc()).limit(
+            RECENT_IMPORTS
+        )
+    ]
+
+
+def _search_service_objects(query):
+    """Return services matching ``query`` in rank order."""
+    found = search_services(query, limit=ADMIN_SEARCH_LIMIT)['results']
+    ids = [row['id'] for row in found]
+    by_id = {
+        svc.id: svc
+        for svc in Service.query.options(*SERVICE_RELATIONS).filter(
+            Service.id.in_(ids)
+        )
+    }
+    return [by_id[sid] for sid in ids if sid in by_id]
+
+
 @admin_bp.route('/services/edit/<int:service_id>', methods=['GET', 'POST'])
 @login_required
 def edit_service(service_id):
@@ -273,11 +432,14 @@ def edit_service(service_id):
         service.unit_id = form.unit.data or None
         db.session.commit()
         return redirect(url_for('admin.services'))
+    page = _list_page(Service, *SERVICE_RELATIONS)
     return render_template(
         'services.html',
         form=form,
         delete_form=delete_form,
-        services=Service.query.all(),
+        services=page.items,
+        page=page,
+        imports=_recent_imports(),
     )
 
 
@@ -293,158 +455,70 @@ def delete_service(service_id):
 @admin_bp.route('/services/delete-selected', methods=['POST'])
 @login_required
 def delete_selected_services():
-    ids = request.form.getlist('service_ids')
-    for sid in ids:
-        svc = db.session.get(Service, sid)
-        if svc:
-            db.session.delete(svc)
+    ids = _selected_ids('service_ids')
     if ids:
-        db.session.commit()
+        count = _delete_selected(Service, ids)
+        flash(f'Deleted {count} services')
     return redirect(url_for('admin.services'))
 
 
 @admin_bp.route('/services/export')
 @login_required
 def export_services():
-    data = export_csv(
-        Service.query.all(),
+    return _csv_response(
+        select(
+            Service.id,
+            Service.name,
+            Service.price,
+            Category.name.label('category'),
+            UnitOfMeasurement.abbreviation.label('unit'),
+        )
+        .outerjoin(Category, Category.id == Service.category_id)
+        .outerjoin(UnitOfMeasurement, UnitOfMeasurement.id == Service.unit_id)
+        .order_by(Service.id),
         [
             ('id', lambda s: s.id),
             ('name', lambda s: s.name),
             ('price', lambda s: f"{s.price:.2f}"),
-            (
-                'category',
-                lambda s: s.category.name if s.category else '',
-            ),
-            (
-                'unit',
-                lambda s: s.unit.abbreviation if s.unit else '',
-            ),
+            ('category', lambda s: s.category or ''),
+            ('unit', lambda s: s.unit or ''),
         ],
+        'services.csv',
     )
-    response = Response(data, mimetype='text/csv')
-    response.headers['Content-Disposition'] = (
-        'attachment; filename=services.csv'
-    )
-    return response
 
 
 @admin_bp.route('/services/import', methods=['POST'])
 @login_required
 def import_services():
-    errors = []
+    max_bytes = current_app.config.get('IMPORT_MAX_BYTES', 0)
     file = request.files.get('file')
     if not file or file.filename == '':
-        errors.append('No file provided')
-    else:
-        try:
-            stream = io.StringIO(file.stream.read().decode('utf-8'))
-        except Exception:
-            stream = None
-            errors.append('Invalid CSV')
+        flash('No file provided')
+        return redirect(url_for('admin.services'))
+    if max_bytes and (request.content_length or 0) > max_bytes:
+        flash(f'File is larger than {max_bytes} bytes')
+        return redirect(url_for('admin.services'))
 
-    if errors:
-        flash('\n'.join(errors))
+    try:
+        job = submit(file)
+    except FileTooLarge:
+        flash(f'File is larger than {max_bytes} bytes')
         return redirect(url_for('admin.services'))
+    flash(f'Import {job.id} of {job.filename} started')
+    return redirect(url_for('admin.services'))
 
-    def validate_columns(fieldnames):
-        required = {'name', 'price', 'category', 'unit'}
-        if not fieldnames or not required.issubset(fieldnames):
-            return 'Missing columns'
 
-    category_cache = {
-        c.name.lower(): c
-        for c in Category.query.all()
-    }
-    unit_cache = {
-        u.abbreviation.lower(): u
-        for u in UnitOfMeasurement.query.all()
-    }
-
-    def upsert(row, line_num):
-        svc_id = row.get('id')
-        name = row.get('name')
-        price = row.get('price')
-        category_name = row.get('category')
-        unit_abbrev = row.get('unit')
-
-        if isinstance(svc_id, str):
-            svc_id = svc_id.strip()
-        if isinstance(name, str):
-            name = name.strip()
-        if isinstance(category_name, str):
-            category_name = category_name.strip()
-        if isinstance(unit_abbrev, str):
-            unit_abbrev = unit_abbrev.strip()
-
-        if not name or not price:
-            return f"Row {line_num}: Missing data"
+@admin_bp.route('/services/import/<int:job_id>')
+@login_required
+def import_status(job_id):
+    return jsonify(job_status(ImportJob.query.get_or_404(job_id)))
 
-        try:
-            price_val = decimal.Decimal(price).quantize(
-                decimal.Decimal('0.01')
-            )
-        except decimal.InvalidOperation:
-            return f"Row {line_num}: Invalid price"
-
-        category = None
-        if category_name:
-            cat_key = category_name.lower()
-            category = category_cache.get(cat_key)
-            if not category:
-                category = Category(name=category_name)
-                db.session.add(category)
-                db.session.flush()
-                category_cache[cat_key] = category
-
-        unit = None
-        if unit_abbrev:
-            unit_key = unit_abbrev.lower()
-            unit = unit_cache.get(unit_key)
-            if not unit:
-                unit = UnitOfMeasurement(
-                    name=unit_abbrev,
-                    abbreviation=unit_abbrev,
-                )
-                db.session.add(unit)
-                db.session.flush()
-                unit_cache[unit_key] = unit
-
-        svc = None
-        svc_by_id = False
-        if svc_id:
-            try:
-                svc = Service.query.get(int(svc_id))
-                svc_by_id = svc is not None
-            except ValueError:
-                return f"Row {line_num}: Invalid id"
-        if not svc:
-            svc = Service.query.filter(
-                func.lower(Service.name) == name.lower()
-            ).first()
-        if svc:
-            if svc_by_id:
-                svc.name = name
-            svc.price = price_val
-            svc.category = category
-            svc.unit = unit
-        else:
-            svc = Service(
-                name=name,
-                price=price_val,
-                category=category,
-                unit=unit,
-            )
-            db.session.add(svc)
-
-    errors = import_csv(stream, [validate_columns], upsert)
 
-    db.session.commit()
-    if errors:
-        flash('Import completed with errors:\n' + '\n'.join(errors))
-    else:
-        flash('Services imported')
-    return redirect(url_for('admin.services'))
+@admin_bp.route('/services/import/<int:job_id>/errors')
+@login_required
+def import_errors(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    return Response(job.errors or '', mimetype='text/plain')
 
 
 @admin_bp.route('/settings', methods=['GET', 'POST'])
@@ -0,0 +1,202 @@
+"""Declarative validation of JSON request payloads.
+
+A schema is a tree of nodes compiled once, when the :class:`Schema` is
+created, into the source of a single Python function with every check
+inlined. Validation walks the payload one time and collects every error
+with the path of the offending field, e.g. ``calculation_items[3].quantity``;
+paths are only built for values that fail.
+"""
+import math
+import re
+from typing import Callable, Collection, Dict, List, Optional
+
+NUMBER_RE = re.compile(
+    r"\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*", re.ASCII
+)
+
+
+def format_path(path: tuple) -> str:
+    """Turn a nested ``(parent, key)`` path into ``a.b[0].c``."""
+    parts = []
+    while path:
+        path, key = path
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return "".join(reversed(parts)).lstrip(".")
+
+
+class _Generator:
+    """Collects the lines and constants of a compiled validator."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.namespace: Dict[str, object] = {}
+        self._names = 0
+
+    def name(self, prefix: str) -> str:
+        self._names += 1
+        return f"{prefix}{self._names}"
+
+    def const(self, value) -> str:
+        name = self.name("c")
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def error(self, indent: int, path: str, message: str) -> None:
+        self.emit(indent, f"errors.append(({path}, {self.const(message)}))")
+
+
+class Node:
+    """A field in a schema.
+
+    Leaf nodes provide a boolean :meth:`expression` for a value;
+    containers override :meth:`emit`. ``message`` is reported when the
+    value is invalid and ``missing`` (defaulting to ``message``) when a
+    required value is absent or ``null``.
+    """
+
+    def __init__(
+        self,
+        message: str = "Invalid value.",
+        required: bool = True,
+        missing: Optional[str] = None,
+    ):
+        self.message = message
+        self.required = required
+        self.missing = missing or message
+
+    def expression(self, var: str, gen: _Generator) -> str:
+        raise NotImplementedError
+
+    def emit(self, gen: _Generator, var: str, path: str, indent: int):
+        gen.emit(indent, f"if not ({self.expression(var, gen)}):")
+        gen.error(indent + 1, path, self.message)
+
+
+class Number(Node):
+    """A finite JSON number or a string holding a decimal number."""
+
+    def expression(self, var: str, gen: _Generator) -> str:
+        match = gen.const(NUMBER_RE.fullmatch)
+        isfinite = gen.const(math.isfinite)
+        kind = gen.name("t")
+        # Plain decimals such as "12.50" skip the regular expression. The
+        # json module parses the bare literals NaN and Infinity as floats.
+        return (
+            f"({kind} := type({var})) is int or "
+            f"({kind} is float and {isfinite}({var})) or "
+            f"({kind} is str and ({var}.isascii() and "
+            f"{var}.replace('.', '', 1).isdecimal() "
+            f"or {match}({var}) is not None))"
+        )
+
+
+class Integer(Node):
+    """A JSON integer or a string of ASCII digits."""
+
+    def expression(self, var: str, gen: _Generator) -> str:
+        kind = gen.name("t")
+        return (
+            f"({kind} := type({var})) is int or "
+            f"({kind} is str and {var}.isascii() "
+            f"and {var}.strip().isdecimal())"
+        )
+
+
+class String(Node):
+    """A non-empty string, optionally matching ``pattern``."""
+
+    def __init__(self, pattern: Optional[re.Pattern] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pattern = pattern
+
+    def expression(self, var: str, gen: _Generator) -> str:
+        test = f"type({var}) is str and {var} != ''"
+        if self.pattern is not None:
+            match = gen.const(self.pattern.match)
+            test += f" and {match}({var}) is not None"
+        return test
+
+
+class Code(Node):
+    """A string contained in the collection returned by ``values``.
+
+    ``values`` is called on every validation so it can return a set cached
+    per catalog version.
+    """
+
+    def __init__(self, values: Callable[[], Collection[str]], **kwargs):
+        super().__init__(**kwargs)
+        self.values = values
+
+    def expression(self, var: str, gen: _Generator) -> str:
+        return f"type({var}) is str and {var} in {gen.const(self.values)}()"
+
+
+class Array(Node):
+    """A list of ``items`` with at least ``min_items`` elements."""
+
+    def __init__(self, items: Node, min_items: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.items = items
+        self.min_items = min_items
+
+    def emit(self, gen: _Generator, var: str, path: str, indent: int):
+        index = gen.name("i")
+        item = gen.name("v")
+        gen.emit(
+            indent,
+            f"if type({var}) is not list or len({var}) < {self.min_items}:",
+        )
+        gen.error(indent + 1, path, self.message)
+        gen.emit(indent, "else:")
+        gen.emit(indent + 1, f"for {index}, {item} in enumerate({var}):")
+        self.items.emit(gen, item, f"({path}, {index})", indent + 2)
+
+
+class Object(Node):
+    """A JSON object with the given ``fields``; other keys are ignored."""
+
+    def __init__(self, fields: Dict[str, Node], **kwargs):
+        super().__init__(**kwargs)
+        self.fields = fields
+
+    def emit(self, gen: _Generator, var: str, path: str, indent: int):
+        gen.emit(indent, f"if type({var}) is not dict:")
+        gen.error(indent + 1, path, self.message)
+        gen.emit(indent, "else:")
+        for name, node in self.fields.items():
+            value = gen.name("v")
+            field_path = f"({path}, {name!r})"
+            gen.emit(indent + 1, f"{value} = {var}.get({name!r})")
+            if node.required:
+                gen.emit(indent + 1, f"if {value} is None:")
+                gen.error(indent + 2, field_path, node.missing)
+                gen.emit(indent + 1, "else:")
+            else:
+                gen.emit(indent + 1, f"if {value} is not None:")
+            node.emit(gen, value, field_path, indent + 2)
+
+
+class Schema:
+    """A compiled validator for a tree of :class:`Node` objects."""
+
+    def __init__(self, root: Node):
+        self.root = root
+        gen = _Generator()
+        gen.emit(0, "def check(value, errors):")
+        root.emit(gen, "value", "()", 1)
+        self.source = "\n".join(gen.lines)
+        exec(compile(self.source, "<schema>", "exec"), gen.namespace)
+        self._check = gen.namespace["check"]
+
+    def validate(self, data) -> List[Dict[str, str]]:
+        """Return every error in ``data`` as ``{"field", "message"}``."""
+        errors: list = []
+        self._check(data, errors)
+        return [
+            {"field": format_path(path), "message": message}
+            for path, message in errors
+        ]
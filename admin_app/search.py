@@ -0,0 +1,249 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from flask import current_app
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    event,
+    func,
+    select,
+    text,
+)
+
+from . import db
+from .catalog import get_catalog_cache
+from .models import Category, Service
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Not part of ``db.metadata``: the FTS5 table is created by the DDL below so
+# ``create_all`` never tries to create it as a regular table.
+service_fts = Table(
+    "service_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("name", Text),
+    Column("category", Text),
+)
+
+_CATEGORY_NAME = (
+    "COALESCE((SELECT name FROM category WHERE id = new.category_id), '')"
+)
+
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE service_fts USING fts5("
+    "name, category, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER service_fts_ai AFTER INSERT ON service BEGIN "
+    "INSERT INTO service_fts (rowid, name, category) "
+    f"VALUES (new.id, new.name, {_CATEGORY_NAME}); END",
+    "CREATE TRIGGER service_fts_au AFTER UPDATE OF name, category_id "
+    "ON service BEGIN "
+    "DELETE FROM service_fts WHERE rowid = old.id; "
+    "INSERT INTO service_fts (rowid, name, category) "
+    f"VALUES (new.id, new.name, {_CATEGORY_NAME}); END",
+    "CREATE TRIGGER service_fts_ad AFTER DELETE ON service BEGIN "
+    "DELETE FROM service_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER service_fts_cu AFTER UPDATE OF name ON category BEGIN "
+    "UPDATE service_fts SET category = new.name WHERE rowid IN "
+    "(SELECT id FROM service WHERE category_id = new.id); END",
+]
+
+FTS_REBUILD = [
+    "DELETE FROM service_fts",
+    "INSERT INTO service_fts (rowid, name, category) "
+    "SELECT s.id, s.name, COALESCE(c.name, '') FROM service s "
+    "LEFT JOIN category c ON c.id = s.category_id",
+]
+
+
+def _has_fts_table(connection) -> bool:
+    return bool(
+        connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'service_fts'"
+        ).first()
+    )
+
+
+def install_fts(connection) -> bool:
+    """Create the FTS5 index and its sync triggers on SQLite.
+
+    Returns ``False`` when the backend or the SQLite build lacks FTS5; the
+    in-memory prefix index is used in that case.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    if _has_fts_table(connection):
+        return True
+    try:
+        with connection.begin_nested():
+            for statement in FTS_DDL + FTS_REBUILD:
+                connection.exec_driver_sql(statement)
+    except Exception:
+        return False
+    return True
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_fts(target, connection, **kw):
+    install_fts(connection)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _drop_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS service_fts")
+
+
+def rebuild_fts() -> None:
+    """Re-index every service from scratch."""
+    connection = db.session.connection()
+    if install_fts(connection):
+        for statement in FTS_REBUILD:
+            connection.exec_driver_sql(statement)
+        db.session.commit()
+
+
+def tokenize(value: str) -> List[str]:
+    return TOKEN_RE.findall(value.lower())
+
+
+def _result(service_id, name, price, unit_id, category_id, category) -> dict:
+    return {
+        "id": service_id,
+        "name": name,
+        "price": f"{price:.2f}",
+        "unit_id": unit_id,
+        "category_id": category_id,
+        "category": category or None,
+    }
+
+
+def _uses_fts() -> bool:
+    state = current_app.extensions.setdefault("service_search", {})
+    if "fts" not in state:
+        connection = db.session.connection()
+        state["fts"] = (
+            connection.dialect.name == "sqlite" and _has_fts_table(connection)
+        )
+    return state["fts"]
+
+
+def _search_fts(tokens: List[str], limit: int, offset: int) -> Tuple[list, int]:
+    match = " ".join('"{}"*'.format(tok.replace('"', '""')) for tok in tokens)
+    condition = text("service_fts MATCH :match").bindparams(match=match)
+    total = db.session.execute(
+        select(func.count()).select_from(service_fts).where(condition)
+    ).scalar()
+    rows = db.session.execute(
+        select(
+            Service.id,
+            Service.name,
+            Service.price,
+            Service.unit_id,
+            Service.category_id,
+            service_fts.c.category,
+        )
+        .join(service_fts, service_fts.c.rowid == Service.id)
+        .where(condition)
+        .order_by(text("bm25(service_fts, 10.0, 1.0)"), Service.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return [_result(*row) for row in rows], total
+
+
+class PrefixIndex:
+    """Sorted token list answering prefix queries with binary search.
+
+    Used on backends without FTS5. It is rebuilt whenever the catalog
+    version changes.
+    """
+
+    def __init__(self, rows):
+        self.services: Dict[int, tuple] = {}
+        entries = []
+        for service_id, name, price, unit_id, category_id, category in rows:
+            self.services[service_id] = (
+                service_id, name, price, unit_id, category_id, category
+            )
+            entries.extend((tok, service_id, 1) for tok in tokenize(name))
+            entries.extend(
+                (tok, service_id, 0) for tok in tokenize(category or "")
+            )
+        entries.sort()
+        self.tokens = [entry[0] for entry in entries]
+        self.entries = entries
+
+    def _matches(self, prefix: str) -> Dict[int, int]:
+        found: Dict[int, int] = {}
+        pos = bisect_left(self.tokens, prefix)
+        while pos < len(self.tokens) and self.tokens[pos].startswith(prefix):
+            _, service_id, in_name = self.entries[pos]
+            weight = 10 if in_name else 1
+            found[service_id] = max(found.get(service_id, 0), weight)
+            pos += 1
+        return found
+
+    def search(self, tokens: List[str], limit: int, offset: int):
+        scores: Dict[int, int] = {}
+        for i, tok in enumerate(tokens):
+            found = self._matches(tok)
+            if i == 0:
+                scores = found
+            else:
+                scores = {
+                    sid: score + found[sid]
+                    for sid, score in scores.items()
+                    if sid in found
+                }
+            if not scores:
+                break
+        ranked = sorted(
+            scores,
+            key=lambda sid: (
+                -scores[sid], len(self.services[sid][1]), sid
+            ),
+        )
+        page = ranked[offset:offset + limit]
+        return [_result(*self.services[sid]) for sid in page], len(ranked)
+
+
+def _prefix_index() -> PrefixIndex:
+    def build() -> PrefixIndex:
+        rows = db.session.execute(
+            select(
+                Service.id,
+                Service.name,
+                Service.price,
+                Service.unit_id,
+                Service.category_id,
+                Category.name,
+            ).outerjoin(Category, Category.id == Service.category_id)
+        )
+        return PrefixIndex(rows)
+
+    return get_catalog_cache().get("search-index", build)
+
+
+def search_services(query: str, limit: int = 20, offset: int = 0) -> dict:
+    """Return services matching every word prefix of ``query``, best first."""
+    tokens = tokenize(query or "")
+    if not tokens:
+        results, total = [], 0
+    elif _uses_fts():
+        results, total = _search_fts(tokens, limit, offset)
+    else:
+        results, total = _prefix_index().search(tokens, limit, offset)
+    return {
+        "query": query,
+        "results": results,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
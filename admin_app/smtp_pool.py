@@ -0,0 +1,228 @@
+import smtplib
+import threading
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+
+from flask import Flask, current_app
+
+_init_lock = threading.Lock()
+
+ResultCallback = Callable[[int, Optional[Exception]], Optional[bool]]
+
+
+class _Session:
+    __slots__ = ("smtp", "last_used", "sent")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SMTPPool:
+    """Bounded pool of connected, authenticated SMTP sessions.
+
+    At most ``size`` sessions are open at once. An idle session is checked
+    with ``NOOP`` before reuse once it has been idle for ``noop_interval``
+    seconds and is closed after ``max_idle`` seconds, before the server
+    would drop it. A reused session that turns out to be dead is replaced
+    and the message resent on a new one.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_tls: bool = False,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 2,
+        noop_interval: float = 30,
+        max_idle: float = 240,
+        timeout: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.noop_interval = noop_interval
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle: Deque[_Session] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> _Session:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except BaseException:
+            self._discard(_Session(smtp))
+            raise
+        return _Session(smtp)
+
+    @staticmethod
+    def _discard(session: _Session) -> None:
+        try:
+            session.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            session.smtp.close()
+
+    def _usable(self, session: _Session) -> bool:
+        idle = time.monotonic() - session.last_used
+        if idle >= self.max_idle:
+            return False
+        if idle < self.noop_interval:
+            return True
+        try:
+            return session.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self) -> Optional[_Session]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                session = self._idle.pop()
+            if self._usable(session):
+                return session
+            self._discard(session)
+
+    def _checkin(self, session: _Session) -> None:
+        session.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(session)
+
+    def _send(
+        self, session: _Session, message: EmailMessage
+    ) -> Tuple[Optional[_Session], Optional[Exception]]:
+        """Send ``message`` on ``session``.
+
+        Returns the session to go on with, or ``None`` once no session is
+        usable, and the error that failed the message, if any. When a
+        reused session turns out to be closed the message is resent on a
+        new one, which is returned in its place.
+        """
+        try:
+            session.smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected as exc:
+            if not session.sent:
+                session.smtp.close()
+                return None, exc
+            # The server closed a session we reused; retry on a new one.
+            self._discard(session)
+            try:
+                session = self._connect()
+            except (smtplib.SMTPException, OSError) as connect_exc:
+                error = smtplib.SMTPServerDisconnected(
+                    f"reconnect failed: {connect_exc}"
+                )
+                error.__cause__ = connect_exc
+                return None, error
+            return self._send(session, message)
+        except smtplib.SMTPException as exc:
+            # Rejected message; the session is still usable.
+            return session, exc
+        except OSError as exc:
+            session.smtp.close()
+            return None, exc
+        session.sent += 1
+        return session, None
+
+    def send_many(
+        self,
+        messages: Sequence[EmailMessage],
+        on_result: Optional[ResultCallback] = None,
+    ) -> List[Optional[Exception]]:
+        """Send ``messages`` over one session.
+
+        Returns one entry per message: ``None`` when it was accepted,
+        otherwise the exception that prevented delivery. Recipient and
+        data errors only fail their own message; a connection error fails
+        the message being sent and the rest go out on a new session. When
+        no session can be opened every remaining message gets that error.
+
+        ``on_result`` is called with the index and entry of each message as
+        soon as it is known; returning ``False`` stops the batch, leaving
+        the remaining messages unsent and out of the returned list.
+        """
+        results: List[Optional[Exception]] = []
+
+        def record(error: Optional[Exception]) -> bool:
+            results.append(error)
+            if on_result is None:
+                return True
+            return on_result(len(results) - 1, error) is not False
+
+        self._slots.acquire()
+        session = None
+        try:
+            session = self._checkout()
+            for message in messages:
+                if session is None:
+                    try:
+                        session = self._connect()
+                    except (smtplib.SMTPException, OSError) as exc:
+                        # The rest would fail the same way; don't wait for
+                        # another timeout per message.
+                        while len(results) < len(messages) and record(exc):
+                            pass
+                        break
+                session, error = self._send(session, message)
+                if not record(error):
+                    break
+            if session is not None:
+                self._checkin(session)
+                session = None
+        finally:
+            if session is not None:
+                self._discard(session)
+            self._slots.release()
+        return results
+
+    def send(self, message: EmailMessage) -> None:
+        """Send one message, raising the error if it was not accepted."""
+        error = self.send_many([message])[0]
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for session in idle:
+            self._discard(session)
+
+
+def init_app(app: Flask) -> SMTPPool:
+    config = app.config
+    pool = SMTPPool(
+        config["SMTP_SERVER"],
+        config["SMTP_PORT"],
+        use_tls=config.get("SMTP_USE_TLS", False),
+        username=config.get("SMTP_USERNAME"),
+        password=config.get("SMTP_PASSWORD"),
+        size=config.get("SMTP_POOL_SIZE", 2),
+        noop_interval=config.get("SMTP_NOOP_INTERVAL", 30),
+        max_idle=config.get("SMTP_MAX_IDLE", 240),
+        timeout=config.get("SMTP_TIMEOUT", 30),
+    )
+    app.extensions["smtp_pool"] = pool
+    return pool
+
+
+def get_smtp_pool() -> SMTPPool:
+    """Return the application's pool, created from its current config."""
+    app = current_app._get_current_object()
+    pool = app.extensions.get("smtp_pool")
+    if pool is None:
+        with _init_lock:
+            pool = app.extensions.get("smtp_pool") or init_app(app)
+    return pool
@@ -1,9 +1,58 @@
+import codecs
 import csv
 import io
-from typing import Iterable, List, Callable, Tuple, Any, Optional
+import zlib
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
 
+Column = Tuple[str, Callable[[Any], Any]]
 
-def export_csv(query: Iterable, columns: List[Tuple[str, Callable[[Any], Any]]]) -> str:
+
+def iter_csv(
+    rows: Iterable, columns: List[Column], size: int = 64 * 1024
+) -> Iterator[str]:
+    """Yield CSV text for ``rows`` in blocks of about ``size`` characters.
+
+    The header line is yielded on its own before ``rows`` is iterated, so
+    a streamed response starts immediately even if the first rows are
+    slow to fetch. Only one block is held in memory at a time.
+
+    Args:
+        rows: Iterable of objects to export; may be a lazy result stream.
+        columns: List of tuples (header, getter) where getter takes an object
+            and returns value for the column.
+        size: Approximate number of characters per yielded block.
+
+    Yields:
+        Consecutive pieces of the CSV document.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([header for header, _ in columns])
+    yield output.getvalue()
+    output.seek(0)
+    output.truncate()
+    getters = [getter for _, getter in columns]
+    for obj in rows:
+        writer.writerow([getter(obj) for getter in getters])
+        if output.tell() >= size:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    if output.tell():
+        yield output.getvalue()
+
+
+def export_csv(query: Iterable, columns: List[Column]) -> str:
     """Export iterable of objects to CSV string.
 
     Args:
@@ -14,13 +63,112 @@ def export_csv(query: Iterable, columns: List[Tuple[str, Callable[[Any], Any]]])
     Returns:
         CSV formatted string.
     """
-    output = io.StringIO()
-    writer = csv.writer(output)
-    headers = [header for header, _ in columns]
-    writer.writerow(headers)
-    for obj in query:
-        writer.writerow([getter(obj) for _, getter in columns])
-    return output.getvalue()
+    return "".join(iter_csv(query, columns))
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress ``chunks`` into a gzip stream as they are produced.
+
+    The first chunk is flushed right away so the client receives the start
+    of the response without waiting for a full compression block.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    flush = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if flush:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            flush = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Longest first: the UTF-32 LE mark starts with the UTF-16 LE one.
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+SNIFF_SIZE = 64 * 1024
+
+
+class FileTooLarge(ValueError):
+    """Raised while reading a stream longer than its size limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"file is larger than {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def detect_encoding(head: bytes, fallback: str = "cp1251") -> str:
+    """Return the encoding of a file starting with ``head``.
+
+    A byte order mark decides; otherwise the file is taken as UTF-8 when
+    ``head`` decodes as such, and as ``fallback`` when it does not.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # Not final: ``head`` may end in the middle of a character.
+        codecs.getincrementaldecoder("utf-8")().decode(head)
+    except UnicodeDecodeError:
+        return fallback
+    return "utf-8"
+
+
+class _LimitedReader(io.RawIOBase):
+    """Replay ``head`` then read ``stream``, up to ``max_bytes`` in all."""
+
+    def __init__(self, stream: BinaryIO, head: bytes, max_bytes: int = 0):
+        self.stream = stream
+        self.head = head
+        self.max_bytes = max_bytes
+        self.total = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.head:
+            data, self.head = self.head[: len(buffer)], self.head[len(buffer):]
+        else:
+            data = self.stream.read(len(buffer))
+        self.total += len(data)
+        if self.max_bytes and self.total > self.max_bytes:
+            raise FileTooLarge(self.max_bytes)
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def open_text(
+    stream: BinaryIO, max_bytes: int = 0, fallback: str = "cp1251"
+) -> TextIO:
+    """Wrap binary ``stream`` for incremental decoding as CSV text.
+
+    Only the first block is read up front, to detect the encoding; the
+    rest is decoded as lines are consumed, so memory use does not depend
+    on the size of the file.
+
+    Args:
+        stream: Binary stream, such as an uploaded file.
+        max_bytes: Raise :class:`FileTooLarge` once more bytes than this
+            have been read; ``0`` disables the limit.
+        fallback: Encoding of files that are neither marked nor UTF-8.
+
+    Returns:
+        A text stream yielding lines with their original line endings.
+    """
+    head = stream.read(SNIFF_SIZE)
+    encoding = detect_encoding(head, fallback)
+    raw = _LimitedReader(stream, head, max_bytes)
+    return io.TextIOWrapper(
+        io.BufferedReader(raw), encoding=encoding, newline=""
+    )
 
 
 Validator = Callable[[List[str]], Optional[str]]
@@ -28,18 +176,25 @@ UpsertFn = Callable[[dict, int], Optional[str]]
 
 
 def import_csv(
-    stream: io.StringIO,
+    stream: Iterable[str],
     validators: Iterable[Validator],
     upsert_fn: UpsertFn,
+    max_errors: int = 0,
 ) -> List[str]:
     """Import data from CSV stream using validators and upsert function.
 
+    Rows are read one at a time, so ``stream`` is never held in memory as
+    a whole. Decoding errors raised while reading it are propagated.
+
     Args:
-        stream: Text stream containing CSV data.
+        stream: Text stream or other iterable of lines containing CSV data,
+            such as the result of :func:`open_text`.
         validators: Iterable of callables receiving fieldnames list and returning
             an error message or None.
         upsert_fn: Callable processing each row. It receives row dict and the
             current line number and returns optional error string.
+        max_errors: Keep at most this many row errors, so a bad file does
+            not grow the list without bound; ``0`` keeps them all.
 
     Returns:
         List of error messages collected during processing.
@@ -60,6 +215,6 @@ def import_csv(
 
     for row in reader:
         err = upsert_fn(row, reader.line_num)
-        if err:
+        if err and (not max_errors or len(errors) < max_errors):
             errors.append(err)
     return errors
@@ -0,0 +1,121 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(value: Any, row_id: int) -> str:
+    """Encode the sort key of a row as an opaque URL-safe cursor."""
+    raw = json.dumps([value, row_id], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[list]:
+    """Return ``[value, id]`` from ``cursor`` or ``None`` if it is invalid."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(row_id, int):
+        return None
+    return [value, row_id]
+
+
+class Page:
+    """One page of a keyset-paginated listing.
+
+    ``next_cursor`` and ``prev_cursor`` are ``None`` on the last and first
+    page respectively.
+    """
+
+    def __init__(
+        self,
+        items: List[Any],
+        sort: str,
+        desc: bool,
+        total: int,
+        next_cursor: Optional[str] = None,
+        prev_cursor: Optional[str] = None,
+    ):
+        self.items = items
+        self.sort = sort
+        self.desc = desc
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def order(self) -> str:
+        """The ``sort`` query argument selecting this page's order."""
+        return f"-{self.sort}" if self.desc else self.sort
+
+
+def paginate(
+    query,
+    columns: Dict[str, Any],
+    order: Optional[str],
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    per_page: int = 50,
+    total: int = 0,
+) -> Page:
+    """Return the page of ``query`` following ``after`` or preceding ``before``.
+
+    Rows are ordered by one of ``columns`` and then by ``columns["id"]``,
+    which keeps the order total when the sort column has duplicates. Each
+    page is a range scan starting at the cursor, so its cost does not grow
+    with the page number as ``OFFSET`` would.
+
+    Args:
+        query: Query of model instances to paginate.
+        columns: Sortable columns by name; must include ``"id"``.
+        order: Column name, prefixed with ``-`` for descending order.
+            Unknown names fall back to ``"id"``.
+        after: Cursor of the last row of the previous page.
+        before: Cursor of the first row of the next page.
+        per_page: Maximum number of rows on the page.
+        total: Number of rows in the whole listing, for display.
+
+    Returns:
+        The :class:`Page` of rows.
+    """
+    order = order or "id"
+    desc = order.startswith("-")
+    sort = order.lstrip("-")
+    if sort not in columns:
+        sort, desc = "id", False
+    column, id_column = columns[sort], columns["id"]
+    key = (column, id_column) if sort != "id" else (id_column,)
+
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+    backwards = before_key is not None
+    cursor = after_key or before_key
+    if cursor is not None:
+        values = cursor if sort != "id" else cursor[1:]
+        if desc != backwards:
+            query = query.filter(tuple_(*key) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*key) > tuple_(*values))
+    descending = desc != backwards
+    query = query.order_by(*(c.desc() if descending else c for c in key))
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_of(row) -> str:
+        return encode_cursor(getattr(row, sort), row.id)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if more or backwards:
+            next_cursor = cursor_of(rows[-1])
+        if cursor is not None and (more or not backwards):
+            prev_cursor = cursor_of(rows[0])
+    return Page(rows, sort, desc, total, next_cursor, prev_cursor)
@@ -0,0 +1,60 @@
+"""Measure batch quote throughput on a single core.
+
+Run from the repository root::
+
+    python benchmarks/bench_batch_quote.py
+
+The target is at least 100k priced line items per second.
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from admin_app.pricing import PriceTable, iter_batch_results  # noqa: E402
+
+SERVICES = 20000
+QUOTES = 20000
+ITEMS_PER_QUOTE = 10
+
+
+def main():
+    rnd = random.Random(42)
+    table = PriceTable(
+        (sid, Decimal(rnd.randint(1, 100000)) / 100, f"Service {sid}", "pc")
+        for sid in range(1, SERVICES + 1)
+    )
+    quotes = [
+        {
+            "id": q,
+            "items": [
+                {
+                    "service_id": rnd.randint(1, SERVICES),
+                    "quantity": (
+                        rnd.randint(1, 20)
+                        if rnd.random() < 0.7
+                        else f"{rnd.randint(1, 2000) / 100}"
+                    ),
+                }
+                for _ in range(ITEMS_PER_QUOTE)
+            ],
+        }
+        for q in range(QUOTES)
+    ]
+    items = QUOTES * ITEMS_PER_QUOTE
+
+    start = time.perf_counter()
+    for _ in iter_batch_results(table, quotes, QUOTES, items):
+        pass
+    elapsed = time.perf_counter() - start
+    print(
+        f"{items} line items in {elapsed:.3f}s: "
+        f"{items / elapsed:,.0f} items/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Measure a services CSV import into a fresh SQLite database.
+
+Run from the repository root::
+
+    python benchmarks/bench_import.py
+
+Imports 100k rows, half of them updating existing services, into 500
+categories and 20 units, half of which already exist. The target is a
+few seconds.
+"""
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from admin_app import create_app, db  # noqa: E402
+from admin_app.importer import ServiceImporter, validate_columns  # noqa: E402
+from admin_app.utils.io import import_csv  # noqa: E402
+
+ROWS = 100000
+EXISTING = ROWS // 2
+
+
+def _csv(rnd) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["name", "price", "category", "unit"])
+    for i in range(ROWS):
+        writer.writerow(
+            [
+                f"Service {i}",
+                f"{rnd.randint(1, 100000) / 100:.2f}",
+                f"Category {rnd.randrange(500)}",
+                f"u{rnd.randrange(20)}",
+            ]
+        )
+    return output.getvalue()
+
+
+def _import(data: str):
+    importer = ServiceImporter(db.session)
+    errors = import_csv(io.StringIO(data), [validate_columns], importer.add)
+    importer.flush()
+    db.session.commit()
+    assert not errors, errors[:5]
+    return importer
+
+
+def main():
+    rnd = random.Random(42)
+    data = _csv(rnd)
+    seed = "\n".join(data.splitlines()[: EXISTING + 1]).replace(
+        "Category 4", "Category x"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/bench.db"
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            _import(seed)
+            start = time.perf_counter()
+            importer = _import(data)
+            elapsed = time.perf_counter() - start
+    print(
+        f"{ROWS} rows ({importer.inserted} inserted, "
+        f"{importer.updated} updated) in {elapsed:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
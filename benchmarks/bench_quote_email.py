@@ -0,0 +1,59 @@
+"""Measure how long the bodies of a 500-line quote email take to render.
+
+Run from the repository root::
+
+    python benchmarks/bench_quote_email.py
+
+The target is under a millisecond per email.
+"""
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from admin_app import create_app  # noqa: E402
+from admin_app.emails import quote_email  # noqa: E402
+from admin_app.pricing import PriceTable  # noqa: E402
+
+SERVICES = 2000
+LINES = 500
+ROUNDS = 200
+
+
+def main():
+    rnd = random.Random(42)
+    table = PriceTable(
+        (sid, Decimal(rnd.randint(1, 100000)) / 100, f"Service {sid}", "pc")
+        for sid in range(1, SERVICES + 1)
+    )
+    quote = table.price(
+        [
+            {
+                "service_id": rnd.randint(1, SERVICES),
+                "quantity": rnd.randint(1, 20),
+            }
+            for _ in range(LINES)
+        ]
+    )
+    app = create_app()
+    with app.app_context():
+        for language in ("en", "ru", "pl", "uk"):
+            email = quote_email(language)
+            best = min(
+                timeit.repeat(
+                    lambda: email.render_bodies(
+                        quote["items"], quote["grand_total_price"], "$"
+                    ),
+                    number=ROUNDS,
+                    repeat=5,
+                )
+            )
+            elapsed = best / ROUNDS
+            print(f"{language}: {LINES} lines in {elapsed * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
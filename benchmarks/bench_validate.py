@@ -0,0 +1,64 @@
+"""Measure how long a 1,000-item send-calculation payload takes to validate.
+
+Run from the repository root::
+
+    python benchmarks/bench_validate.py
+
+The target is well under a millisecond per payload.
+"""
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from admin_app import create_app, create_default_data, db  # noqa: E402
+from admin_app.api import SEND_CALCULATION  # noqa: E402
+
+ITEMS = 1000
+ROUNDS = 200
+
+
+def main():
+    rnd = random.Random(42)
+    payload = {
+        "user_email": "user@example.com",
+        "language_code": "en",
+        "currency_code": "USD",
+        "calculation_items": [
+            {
+                "service_id": rnd.randint(1, 5000),
+                "quantity": (
+                    rnd.randint(1, 20)
+                    if rnd.random() < 0.7
+                    else f"{rnd.randint(1, 2000) / 100}"
+                ),
+                "price_per_unit": f"{rnd.randint(1, 100000) / 100}",
+                "item_total_price": f"{rnd.randint(1, 100000) / 100}",
+            }
+            for _ in range(ITEMS)
+        ],
+        "grand_total_price": "12345.67",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/bench.db"
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            create_default_data()
+            assert SEND_CALCULATION.validate(payload) == []
+            best = min(
+                timeit.repeat(
+                    lambda: SEND_CALCULATION.validate(payload),
+                    number=ROUNDS,
+                    repeat=5,
+                )
+            )
+    elapsed = best / ROUNDS
+    print(f"{ITEMS} items validated in {elapsed * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@
       export: 'Export CSV',
       emailPlaceholder: 'your@email',
       chooseService: 'Select service',
+      chooseCategory: 'Select category',
       clearAll: 'Clear all',
       negativeQuantityError: 'Quantity cannot be negative.'
     },
@@ -32,6 +33,7 @@
       export: 'CSV',
       emailPlaceholder: 'email',
       chooseService: '\u0412\u044b\u0431\u0435\u0440\u0438\u0442\u0435 \u0443\u0441\u043b\u0443\u0433\u0443',
+      chooseCategory: '\u0412\u044b\u0431\u0435\u0440\u0438\u0442\u0435 \u043a\u0430\u0442\u0435\u0433\u043e\u0440\u0438\u044e',
       selectAll: '\u0412\u044b\u0431\u0440\u0430\u0442\u044c \u0432\u0441\u0435',
       clearAll: '\u041e\u0447\u0438\u0441\u0442\u0438\u0442\u044c \u0432\u0441\u0435',
       negativeQuantityError: '\u041a\u043e\u043b\u0438\u0447\u0435\u0441\u0442\u0432\u043e \u043d\u0435 \u043c\u043e\u0436\u0435\u0442 \u0431\u044b\u0442\u044c \u043e\u0442\u0440\u0438\u0446\u0430\u0442\u0435\u043b\u044c\u043d\u044b\u043c.'
@@ -48,6 +50,7 @@
       export: 'Eksportuj CSV',
       emailPlaceholder: 'tw\xf3j email',
       chooseService: 'Wybierz us\u0142ug\u0119',
+      chooseCategory: 'Wybierz kategori\u0119',
       selectAll: 'Zaznacz wszystko',
       clearAll: 'Wyczy\u015b\u0107 wszystko',
       negativeQuantityError: 'Ilo\u015b\u0107 nie mo\u017ce by\u0107 ujemna.'
@@ -64,6 +67,7 @@
       export: 'CSV',
       emailPlaceholder: '\u0442\u0432\u0456\u0439 email',
       chooseService: '\u041e\u0431\u0435\u0440\u0456\u0442\u044c \u043f\u043e\u0441\u043b\u0443\u0433\u0443',
+      chooseCategory: '\u041e\u0431\u0435\u0440\u0456\u0442\u044c \u043a\u0430\u0442\u0435\u0433\u043e\u0440\u0456\u044e',
       selectAll: '\u041e\u0431\u0440\u0430\u0442\u0438 \u0432\u0441\u0435',
       clearAll: '\u041e\u0447\u0438\u0441\u0442\u0438\u0442\u0438 \u0432\u0441\u0435',
       negativeQuantityError: '\u041a\u0456\u043b\u044c\u043a\u0456\u0441\u0442\u044c \u043d\u0435 \u043c\u043e\u0436\u0435 \u0431\u0443\u0442\u0438 \u0432\u0456\u0434\u0454\u043c\u043d\u043e\u044e.'
@@ -78,6 +82,10 @@
     module.exports.currencyByLang = currencyByLang;
   }
 
+  // With data-lazy="true" only category headers are loaded up front and
+  // each category's services are fetched the first time it is chosen.
+  const lazy = container.dataset.lazy === 'true';
+
   const state = {
     language: 'en',
     currency: 'USD',
@@ -128,34 +136,75 @@
 
   function findService(id) {
     for (const cat of state.categories) {
-      for (const srv of cat.services) {
+      for (const srv of cat.services || []) {
         if (String(srv.id) === String(id)) return srv;
       }
     }
     return null;
   }
 
-  function addRow() {
-    const tr = createElem('tr', 'row-enter');
-    const tdService = createElem('td');
-    const select = createElem('select');
+  function loadCategoryServices(cat) {
+    if (cat.services) return Promise.resolve(cat.services);
+    if (!cat.loading) {
+      const services = [];
+      const loadPage = after => fetch(`${API_BASE}/categories/${cat.id}/services?after=${after}`)
+        .then(r => r.json())
+        .then(page => {
+          services.push(...page.services);
+          return page.next_after ? loadPage(page.next_after) : services;
+        });
+      cat.loading = loadPage(0).then(loaded => {
+        cat.services = loaded;
+        return loaded;
+      }).finally(() => {
+        cat.loading = null;
+      });
+    }
+    return cat.loading;
+  }
+
+  function createPlaceholder(key) {
     const placeholder = createElem('option');
     placeholder.value = '';
-    placeholder.textContent = t('chooseService');
+    placeholder.textContent = t(key);
     placeholder.disabled = true;
     placeholder.selected = true;
-    select.appendChild(placeholder);
-    state.categories.forEach(cat => {
-      const optGroup = createElem('optgroup');
-      optGroup.label = cat.name;
-      cat.services.forEach(srv => {
+    return placeholder;
+  }
+
+  function appendServiceOptions(parent, services) {
+    services.forEach(srv => {
+      const opt = createElem('option');
+      opt.value = srv.id;
+      opt.textContent = srv.name;
+      parent.appendChild(opt);
+    });
+  }
+
+  function addRow() {
+    const tr = createElem('tr', 'row-enter');
+    const tdService = createElem('td');
+    const select = createElem('select');
+    select.appendChild(createPlaceholder('chooseService'));
+    let categorySelect = null;
+    if (lazy) {
+      categorySelect = createElem('select');
+      categorySelect.appendChild(createPlaceholder('chooseCategory'));
+      state.categories.forEach(cat => {
         const opt = createElem('option');
-        opt.value = srv.id;
-        opt.textContent = srv.name;
-        optGroup.appendChild(opt);
+        opt.value = cat.id;
+        opt.textContent = `${cat.name} (${cat.service_count})`;
+        categorySelect.appendChild(opt);
       });
-      select.appendChild(optGroup);
-    });
+      tdService.appendChild(categorySelect);
+    } else {
+      state.categories.forEach(cat => {
+        const optGroup = createElem('optgroup');
+        optGroup.label = cat.name;
+        appendServiceOptions(optGroup, cat.services);
+        select.appendChild(optGroup);
+      });
+    }
     tdService.appendChild(select);
 
     const tdQty = createElem('td');
@@ -201,7 +250,7 @@
     tdPrice.setAttribute('data-label-price', t('unitPrice'));
     tdTotal.setAttribute('data-label-total', t('total'));
 
-    const item = { row: tr, service: select, qty: qtyInput, price: priceSpan, total: totalSpan, select: selectChk };
+    const item = { row: tr, category: categorySelect, service: select, qty: qtyInput, price: priceSpan, total: totalSpan, select: selectChk };
     state.items.push(item);
 
     function updatePrice() {
@@ -211,6 +260,19 @@
     }
 
     select.addEventListener('change', updatePrice);
+    if (categorySelect) {
+      categorySelect.addEventListener('change', () => {
+        const cat = state.categories.find(c => String(c.id) === categorySelect.value);
+        if (!cat) return;
+        loadCategoryServices(cat).then(services => {
+          if (categorySelect.value !== String(cat.id)) return;
+          while (select.options.length > 1) select.remove(1);
+          select.options[0].selected = true;
+          appendServiceOptions(select, services);
+          updatePrice();
+        }).catch(err => console.error(err));
+      });
+    }
     qtyInput.addEventListener('input', recalc);
     removeBtn.addEventListener('click', () => {
       tr.classList.add('row-exit');
@@ -284,18 +346,23 @@
       };
     });
     const grand = items.reduce((acc, it) => acc + parseFloat(it.item_total_price), 0).toFixed(2);
+    // Ignore repeated clicks until the first request has been answered.
+    sendBtn.disabled = true;
     fetch(API_BASE + '/send-calculation', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({
         user_email: email,
         language_code: state.language,
+        currency_code: state.currency,
         calculation_items: items,
         grand_total_price: grand
       })
     }).then(r => r.json()).then(data => {
       alert(data.message || 'Ok');
-    }).catch(() => alert('Error'));
+    }).catch(() => alert('Error')).then(() => {
+      sendBtn.disabled = false;
+    });
   }
 
   const errorContainer = createElem('div', 'error-container');
@@ -392,6 +459,9 @@
       if (item.service.options[0]) {
         item.service.options[0].textContent = t('chooseService');
       }
+      if (item.category && item.category.options[0]) {
+        item.category.options[0].textContent = t('chooseCategory');
+      }
     });
   }
 
@@ -414,13 +484,32 @@
     currSelect.value = state.currency;
   }
 
+  // Columnar payloads send each service as a row tuple described by
+  // service_fields, with prices as integers in minor units.
+  function decodeColumnar(data) {
+    const fields = data.service_fields;
+    const priceIdx = fields.indexOf('price');
+    const scale = data.price_scale || 0;
+    const divisor = Math.pow(10, scale);
+    return data.categories.map(cat => ({
+      id: cat.id,
+      name: cat.name,
+      services: cat.services.map(row => {
+        const srv = {};
+        for (let i = 0; i < fields.length; i++) srv[fields[i]] = row[i];
+        srv.price = (row[priceIdx] / divisor).toFixed(scale);
+        return srv;
+      })
+    }));
+  }
+
   function fetchData() {
-    fetch(API_BASE + '/calculator-data')
+    fetch(API_BASE + (lazy ? '/calculator-data/bootstrap' : '/calculator-data?format=columnar'))
       .then(r => r.json())
       .then(data => {
         state.languages = data.languages;
         state.currencies = data.currencies;
-        state.categories = data.categories;
+        state.categories = data.format === 'columnar' ? decodeColumnar(data) : data.categories;
         Object.assign(currencyByLang, data.currency_by_lang || {});
 
         const fallbackLang = data.settings.default_language_id || 'en';
@@ -0,0 +1,49 @@
+const fs = require('fs');
+const path = require('path');
+const {JSDOM} = require('jsdom');
+
+function flushPromises() {
+  return new Promise(resolve => setImmediate(resolve));
+}
+
+describe('calculator widget columnar catalog', () => {
+  test('decodes row tuples and minor-unit prices', async () => {
+    const htmlPath = path.join(__dirname, '..', 'index.html');
+    const html = fs.readFileSync(htmlPath, 'utf8');
+    const dom = new JSDOM(html, {
+      runScripts: 'dangerously',
+      resources: 'usable',
+      url: 'file://' + htmlPath
+    });
+
+    const mockData = {
+      format: 'columnar',
+      service_fields: ['id', 'name', 'price', 'unit_id'],
+      price_scale: 2,
+      settings: { default_language_id: 'en', default_currency_id: 'USD' },
+      languages: [{ id: 'en', name: 'English' }],
+      currencies: [{ id: 'USD', code: 'USD', symbol: '$', name: 'US Dollar' }],
+      currency_by_lang: { en: 'USD' },
+      units_of_measurement: [],
+      categories: [
+        { id: 1, name: 'Cat', services: [[5, 'Srv', 1250, 1]] }
+      ]
+    };
+
+    dom.window.fetch = jest.fn(() => Promise.resolve({
+      json: () => Promise.resolve(mockData)
+    }));
+
+    await new Promise(res => dom.window.addEventListener('load', res));
+    await flushPromises();
+    await flushPromises();
+
+    expect(dom.window.fetch.mock.calls[0][0]).toBe('/api/v1/calculator-data?format=columnar');
+    const row = dom.window.document.querySelector('tbody tr');
+    const select = row.querySelector('select');
+    expect(select.options[1].value).toBe('5');
+    select.value = '5';
+    select.dispatchEvent(new dom.window.Event('change'));
+    expect(row.querySelector('.price').textContent).toBe('12.50');
+  });
+});
@@ -0,0 +1,58 @@
+const fs = require('fs');
+const path = require('path');
+const {JSDOM} = require('jsdom');
+
+function flushPromises() {
+  return new Promise(resolve => setImmediate(resolve));
+}
+
+describe('calculator widget lazy catalog', () => {
+  test('loads services of a category only when it is chosen', async () => {
+    const htmlPath = path.join(__dirname, '..', 'index.html');
+    const html = fs.readFileSync(htmlPath, 'utf8').replace(
+      'id="calculator-widget"',
+      'id="calculator-widget" data-lazy="true"'
+    );
+    const dom = new JSDOM(html, {
+      runScripts: 'dangerously',
+      resources: 'usable',
+      url: 'file://' + htmlPath
+    });
+
+    const bootstrap = {
+      settings: { default_language_id: 'en', default_currency_id: 'USD' },
+      languages: [{ id: 'en', name: 'English' }],
+      currencies: [{ id: 'USD', code: 'USD', symbol: '$', name: 'US Dollar' }],
+      currency_by_lang: { en: 'USD' },
+      units_of_measurement: [],
+      categories: [{ id: 7, name: 'Cat', service_count: 1 }]
+    };
+    const page = {
+      category_id: 7,
+      services: [{ id: 3, name: 'Srv', price: '2.50', unit_id: 1 }],
+      next_after: null
+    };
+
+    dom.window.fetch = jest.fn(url => Promise.resolve({
+      json: () => Promise.resolve(url.includes('/categories/7/services') ? page : bootstrap)
+    }));
+
+    await new Promise(res => dom.window.addEventListener('load', res));
+    await flushPromises();
+    await flushPromises();
+
+    expect(dom.window.fetch.mock.calls[0][0]).toBe('/api/v1/calculator-data/bootstrap');
+    const row = dom.window.document.querySelector('tbody tr');
+    const [categorySelect, serviceSelect] = row.querySelectorAll('select');
+    expect(serviceSelect.options.length).toBe(1);
+
+    categorySelect.value = '7';
+    categorySelect.dispatchEvent(new dom.window.Event('change'));
+    await flushPromises();
+    await flushPromises();
+
+    expect(dom.window.fetch).toHaveBeenCalledTimes(2);
+    expect(serviceSelect.options.length).toBe(2);
+    expect(serviceSelect.options[1].textContent).toBe('Srv');
+  });
+});
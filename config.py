@@ -9,12 +9,71 @@ class Config:
         "SQLALCHEMY_DATABASE_URI", "sqlite:///app.db"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 15))
 
     SMTP_SERVER = os.environ.get("SMTP_SERVER", "localhost")
     SMTP_PORT = int(os.environ.get("SMTP_PORT", 25))
     SMTP_USERNAME = os.environ.get("SMTP_USERNAME")
     SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
     SMTP_USE_TLS = os.environ.get("SMTP_USE_TLS", "false").lower() == "true"
+    SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+    SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 2))
+    SMTP_NOOP_INTERVAL = float(os.environ.get("SMTP_NOOP_INTERVAL", 30))
+    SMTP_MAX_IDLE = float(os.environ.get("SMTP_MAX_IDLE", 240))
+
+    OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", 1))
+    OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 5))
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 8))
+    OUTBOX_RETRY_BASE = float(os.environ.get("OUTBOX_RETRY_BASE", 30))
+    OUTBOX_RETRY_MAX = float(os.environ.get("OUTBOX_RETRY_MAX", 3600))
+    OUTBOX_LEASE = float(os.environ.get("OUTBOX_LEASE", 300))
+
+    CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", 300))
+    CATALOG_HTTP_MAX_AGE = int(os.environ.get("CATALOG_HTTP_MAX_AGE", 0))
+    CATALOG_PAGE_SIZE = int(os.environ.get("CATALOG_PAGE_SIZE", 500))
+    CATALOG_STREAM_BATCH = int(os.environ.get("CATALOG_STREAM_BATCH", 1000))
+    CATALOG_CHANGES_MAX = int(os.environ.get("CATALOG_CHANGES_MAX", 5000))
+
+    ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", 50))
+    EXPORT_GZIP_LEVEL = int(os.environ.get("EXPORT_GZIP_LEVEL", 6))
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+    IMPORT_COMMIT_EVERY = int(os.environ.get("IMPORT_COMMIT_EVERY", 10000))
+    IMPORT_MAX_BYTES = int(os.environ.get("IMPORT_MAX_BYTES", 1024 ** 3))
+    IMPORT_FALLBACK_ENCODING = os.environ.get(
+        "IMPORT_FALLBACK_ENCODING", "cp1251"
+    )
+    IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", 1))
+    IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 10000))
+    IMPORT_LEASE = float(os.environ.get("IMPORT_LEASE", 900))
+    IMPORT_UPLOAD_DIR = os.environ.get("IMPORT_UPLOAD_DIR", "")
+
+    BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", 16 * 1024 * 1024))
+    BATCH_MAX_QUOTES = int(os.environ.get("BATCH_MAX_QUOTES", 10000))
+    BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 200000))
+
+    RATELIMIT_ENABLED = (
+        os.environ.get("RATELIMIT_ENABLED", "true").lower() == "true"
+    )
+    RATELIMIT_STORAGE_URL = os.environ.get(
+        "RATELIMIT_STORAGE_URL", "memory://"
+    )
+    RATELIMIT_MAX_KEYS = int(os.environ.get("RATELIMIT_MAX_KEYS", 10000))
+    RATELIMIT_SEND_PER_IP = os.environ.get(
+        "RATELIMIT_SEND_PER_IP", "20/minute"
+    )
+    RATELIMIT_SEND_PER_EMAIL = os.environ.get(
+        "RATELIMIT_SEND_PER_EMAIL", "5/10minutes"
+    )
+    RATELIMIT_DATA_PER_IP = os.environ.get(
+        "RATELIMIT_DATA_PER_IP", "120/minute"
+    )
+
+    IDEMPOTENCY_KEY_TTL = float(os.environ.get("IDEMPOTENCY_KEY_TTL", 86400))
+    IDEMPOTENCY_HASH_TTL = float(os.environ.get("IDEMPOTENCY_HASH_TTL", 60))
+    IDEMPOTENCY_MAX_ENTRIES = int(
+        os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000)
+    )
 
     CURRENCY_BY_LANG = {
         "pl": "PLN",
@@ -0,0 +1,68 @@
+"""add service search index
+
+Revision ID: 73bed8887424
+Revises: b93449dd8cac
+Create Date: 2026-10-18 11:48:02.207514
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '73bed8887424'
+down_revision = 'b93449dd8cac'
+branch_labels = None
+depends_on = None
+
+CATEGORY_NAME = (
+    "COALESCE((SELECT name FROM category WHERE id = new.category_id), '')"
+)
+
+
+def upgrade():
+    # FTS5 is SQLite specific; other backends use the in-memory index.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE service_fts USING fts5("
+        "name, category, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER service_fts_ai AFTER INSERT ON service BEGIN "
+        "INSERT INTO service_fts (rowid, name, category) "
+        f"VALUES (new.id, new.name, {CATEGORY_NAME}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER service_fts_au AFTER UPDATE OF name, category_id "
+        "ON service BEGIN "
+        "DELETE FROM service_fts WHERE rowid = old.id; "
+        "INSERT INTO service_fts (rowid, name, category) "
+        f"VALUES (new.id, new.name, {CATEGORY_NAME}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER service_fts_ad AFTER DELETE ON service BEGIN "
+        "DELETE FROM service_fts WHERE rowid = old.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER service_fts_cu AFTER UPDATE OF name ON category "
+        "BEGIN UPDATE service_fts SET category = new.name WHERE rowid IN "
+        "(SELECT id FROM service WHERE category_id = new.id); END"
+    )
+    op.execute(
+        "INSERT INTO service_fts (rowid, name, category) "
+        "SELECT s.id, s.name, COALESCE(c.name, '') FROM service s "
+        "LEFT JOIN category c ON c.id = s.category_id"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in (
+        'service_fts_ai',
+        'service_fts_au',
+        'service_fts_ad',
+        'service_fts_cu',
+    ):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS service_fts")
@@ -20,6 +20,8 @@ def app():
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     app.config['SMTP_SERVER'] = 'localhost'
     app.config['SMTP_PORT'] = 25
+    app.config['OUTBOX_WORKERS'] = 0
+    app.config['IMPORT_WORKERS'] = 0
     with app.app_context():
         db.create_all()
         lang = Language(code='en', name='English')
@@ -132,6 +132,60 @@ def test_delete_multiple_services(client, app, login):
             assert db.session.get(Service, int(sid)) is None
 
 
+def test_delete_selected_services_in_chunks(client, app, login):
+    login()
+    with app.app_context():
+        db.session.add_all(
+            Service(name=f'bulk {i}', price=Decimal('1.00'))
+            for i in range(1200)
+        )
+        db.session.commit()
+        ids = [str(sid) for (sid,) in db.session.query(Service.id)]
+    resp = client.post(
+        '/services/delete-selected',
+        data={'service_ids': ids + ['99999', 'x']},
+        follow_redirects=True,
+    )
+    assert 'Deleted 1201 services' in resp.text
+    with app.app_context():
+        assert Service.query.count() == 0
+
+
+def test_delete_selected_categories_detaches_services(client, app, login):
+    version = int(
+        client.get('/api/v1/calculator-data').headers['X-Catalog-Version']
+    )
+    login()
+    with app.app_context():
+        svc = Service.query.first()
+        svc_id, cat_id, unit_id = svc.id, svc.category_id, svc.unit_id
+    resp = client.post(
+        '/categories/delete-selected',
+        data={'category_ids': [str(cat_id)]},
+        follow_redirects=True,
+    )
+    assert 'Deleted 1 categories' in resp.text
+    client.post(
+        '/units/delete-selected',
+        data={'unit_ids': [str(unit_id)]},
+        follow_redirects=True,
+    )
+    with app.app_context():
+        svc = db.session.get(Service, svc_id)
+        assert svc.category_id is None
+        assert svc.unit_id is None
+    changes = {
+        (c['entity'], c['id']): c
+        for c in client.get(
+            f'/api/v1/calculator-data/changes?since={version}'
+        ).get_json()['changes']
+    }
+    assert changes[('category', cat_id)]['op'] == 'delete'
+    assert changes[('unit', unit_id)]['op'] == 'delete'
+    assert changes[('service', svc_id)]['data']['category_id'] is None
+    assert changes[('service', svc_id)]['data']['unit_id'] is None
+
+
 def test_service_crud(client, app, login):
     login()
     with app.app_context():
@@ -0,0 +1,90 @@
+import re
+from decimal import Decimal
+
+from admin_app import db
+from admin_app.catalog import row_count
+from admin_app.models import Service
+from admin_app.utils.pagination import decode_cursor, encode_cursor
+
+
+def _add_services(app, names):
+    with app.app_context():
+        db.session.add_all(
+            Service(name=name, price=Decimal('1.00')) for name in names
+        )
+        db.session.commit()
+
+
+def _names(resp):
+    return re.findall(r'<td data-label="Name">([^<]*)</td>', resp.text)
+
+
+def _link(resp, label):
+    match = re.search(r'<a href="([^"]*)">' + label, resp.text)
+    return match.group(1).replace('&amp;', '&') if match else None
+
+
+def test_services_are_paginated_by_cursor(client, app, login):
+    app.config['ADMIN_PAGE_SIZE'] = 3
+    _add_services(app, [f'svc {i:02d}' for i in range(7)])
+    login()
+    resp = client.get('/services')
+    assert _names(resp) == ['Test Service', 'svc 00', 'svc 01']
+    assert _link(resp, '&laquo; Previous') is None
+    assert '8 total' in resp.text
+
+    resp = client.get(_link(resp, 'Next'))
+    assert _names(resp) == ['svc 02', 'svc 03', 'svc 04']
+    resp = client.get(_link(resp, 'Next'))
+    assert _names(resp) == ['svc 05', 'svc 06']
+    assert _link(resp, 'Next') is None
+
+    resp = client.get(_link(resp, '&laquo; Previous'))
+    assert _names(resp) == ['svc 02', 'svc 03', 'svc 04']
+    resp = client.get(_link(resp, '&laquo; Previous'))
+    assert _names(resp) == ['Test Service', 'svc 00', 'svc 01']
+    assert _link(resp, '&laquo; Previous') is None
+
+
+def test_services_sorted_by_name_descending(client, app, login):
+    app.config['ADMIN_PAGE_SIZE'] = 2
+    _add_services(app, ['b', 'a', 'b', 'c'])
+    login()
+    seen = []
+    url = '/services?sort=-name'
+    while url:
+        resp = client.get(url)
+        seen += _names(resp)
+        url = _link(resp, 'Next')
+    assert seen == ['c', 'b', 'b', 'a', 'Test Service']
+
+
+def test_edit_page_lists_one_page(client, app, login):
+    app.config['ADMIN_PAGE_SIZE'] = 2
+    _add_services(app, ['x', 'y', 'z'])
+    login()
+    with app.app_context():
+        svc_id = Service.query.filter_by(name='z').first().id
+    resp = client.get(f'/services/edit/{svc_id}')
+    assert _names(resp) == ['Test Service', 'x']
+
+
+def test_row_count_is_cached_until_catalog_changes(app):
+    with app.app_context():
+        assert row_count(Service) == 1
+        db.session.execute(
+            Service.__table__.insert().values(name='raw', price=1)
+        )
+        assert row_count(Service) == 1
+        db.session.add(Service(name='new', price=Decimal('1.00')))
+        db.session.commit()
+        assert row_count(Service) == 3
+
+
+def test_invalid_cursor_is_ignored(client, login):
+    login()
+    assert decode_cursor('not a cursor') is None
+    assert decode_cursor(encode_cursor('a', 'b')) is None
+    resp = client.get('/services?after=garbage&sort=price')
+    assert resp.status_code == 200
+    assert _names(resp) == ['Test Service']
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from admin_app import db
+from admin_app.models import Category, Service, UnitOfMeasurement
+from tests.test_calculator_data import _count_queries
+
+
+def _add_services(app, count, start=0):
+    """Add services that each have their own category and unit."""
+    with app.app_context():
+        for i in range(start, start + count):
+            db.session.add(
+                Service(
+                    name=f'svc {i}',
+                    price=Decimal('1.00'),
+                    category=Category(name=f'cat {i}'),
+                    unit=UnitOfMeasurement(name=f'unit {i}', abbreviation=f'u{i}'),
+                )
+            )
+        db.session.commit()
+
+
+def _queries(app, client, url):
+    client.get(url)  # warm the row count cache
+    return _count_queries(app, lambda: client.get(url))
+
+
+def test_services_page_query_count_is_constant(client, app, login):
+    login()
+    _add_services(app, 2)
+    few = _queries(app, client, '/services')
+    _add_services(app, 20, start=2)
+    many = _queries(app, client, '/services')
+    assert 'cat 21' in client.get('/services').text
+    assert few == many
+
+
+def test_services_search_query_count_is_constant(client, app, login):
+    login()
+    _add_services(app, 2)
+    few = _queries(app, client, '/services?q=svc')
+    _add_services(app, 20, start=2)
+    many = _queries(app, client, '/services?q=svc')
+    assert few == many
+
+
+def test_services_export_query_count_is_constant(client, app, login):
+    login()
+    _add_services(app, 2)
+    few = _queries(app, client, '/services/export')
+    _add_services(app, 20, start=2)
+    many = _queries(app, client, '/services/export')
+    assert few == many
+    lines = client.get('/services/export').text.splitlines()
+    assert lines[-1] == '23,svc 21,1.00,cat 21,u21'
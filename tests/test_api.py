@@ -1,5 +1,7 @@
 import smtplib
 
+from admin_app.outbox import deliver_due
+
 
 class DummySMTP:
     def __init__(self, *args, **kwargs):
@@ -17,6 +19,15 @@ class DummySMTP:
     def login(self, user, password):
         pass
 
+    def noop(self):
+        return 250, b'OK'
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
     def send_message(self, message):
         self.sent = True
 
@@ -40,8 +51,9 @@ def test_send_calculation_invalid_email(client):
     assert resp.status_code == 400
 
 
-def test_send_calculation_success(client, monkeypatch):
-    monkeypatch.setattr(smtplib, 'SMTP', lambda *a, **kw: DummySMTP())
+def test_send_calculation_success(client, app, monkeypatch):
+    smtp = DummySMTP()
+    monkeypatch.setattr(smtplib, 'SMTP', lambda *a, **kw: smtp)
     resp = client.post(
         '/api/v1/send-calculation',
         json={
@@ -57,9 +69,17 @@ def test_send_calculation_success(client, monkeypatch):
             'grand_total_price': '2',
         },
     )
-    assert resp.status_code == 200
+    assert resp.status_code == 202
     data = resp.get_json()
     assert data['status'] == 'success'
+    with app.app_context():
+        assert deliver_due() == 1
+    assert smtp.sent
+    status = client.get(
+        f"/api/v1/send-calculation/{data['message_id']}"
+    ).get_json()
+    assert status['state'] == 'sent'
+    assert status['attempts'] == 1
 
 
 class FailingSMTP(DummySMTP):
@@ -67,7 +87,7 @@ class FailingSMTP(DummySMTP):
         raise smtplib.SMTPException('fail')
 
 
-def test_send_calculation_smtp_error(client, monkeypatch):
+def test_send_calculation_smtp_error(client, app, monkeypatch):
     monkeypatch.setattr(smtplib, 'SMTP', lambda *a, **kw: FailingSMTP())
     resp = client.post(
         '/api/v1/send-calculation',
@@ -84,6 +104,15 @@ def test_send_calculation_smtp_error(client, monkeypatch):
             'grand_total_price': '2',
         },
     )
-    assert resp.status_code == 500
-    data = resp.get_json()
-    assert data['status'] == 'error'
+    assert resp.status_code == 202
+    message_id = resp.get_json()['message_id']
+    with app.app_context():
+        assert deliver_due() == 1
+        # The retry is scheduled with backoff, not attempted right away.
+        assert deliver_due() == 0
+    status = client.get(f'/api/v1/send-calculation/{message_id}').get_json()
+    assert status['state'] == 'pending'
+    assert status['attempts'] == 1
+    assert status['error'] == 'delivery_failed'
+    assert 'last_error' not in status
+    assert status['next_attempt_at'] is not None
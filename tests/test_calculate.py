@@ -0,0 +1,202 @@
+import json
+import smtplib
+from decimal import Decimal
+
+from admin_app import db
+from admin_app.models import Service
+from admin_app.outbox import deliver_due
+
+
+def _service_id(app, name='Test Service'):
+    with app.app_context():
+        return Service.query.filter_by(name=name).first().id
+
+
+def test_calculate_prices_items_with_decimals(client, app):
+    with app.app_context():
+        db.session.add(Service(name='Tenth', price=Decimal('0.10')))
+        db.session.commit()
+    svc_id = _service_id(app)
+    tenth_id = _service_id(app, 'Tenth')
+    resp = client.post(
+        '/api/v1/calculate',
+        json={
+            'items': [
+                {'service_id': svc_id, 'quantity': '2.5'},
+                {'service_id': tenth_id, 'quantity': 3},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [i['item_total_price'] for i in data['items']] == ['2.50', '0.30']
+    assert data['items'][0]['name'] == 'Test Service'
+    assert data['items'][1]['quantity'] == '3'
+    assert data['grand_total_price'] == '2.80'
+
+
+def test_calculate_rejects_unknown_service_and_bad_quantity(client, app):
+    resp = client.post(
+        '/api/v1/calculate',
+        json={'items': [{'service_id': 9999, 'quantity': 1}]},
+    )
+    assert resp.status_code == 400
+    assert 'unknown service' in resp.get_json()['message']
+
+    resp = client.post(
+        '/api/v1/calculate',
+        json={'items': [{'service_id': _service_id(app), 'quantity': '-1'}]},
+    )
+    assert resp.status_code == 400
+
+    resp = client.post('/api/v1/calculate', json={'items': []})
+    assert resp.status_code == 400
+
+
+def test_calculate_rejects_non_object_body_and_huge_quantity(client, app):
+    for body in ([1], 'x'):
+        resp = client.post('/api/v1/calculate', json=body)
+        assert resp.status_code == 400
+
+    svc_id = _service_id(app)
+    for quantity in ('1e30', 1e30, 10 ** 30):
+        resp = client.post(
+            '/api/v1/calculate',
+            json={'items': [{'service_id': svc_id, 'quantity': quantity}]},
+        )
+        assert resp.status_code == 400
+        assert 'at most' in resp.get_json()['message']
+
+    resp = client.post(
+        '/api/v1/send-calculation',
+        json={
+            'user_email': 'user@example.com',
+            'language_code': 'en',
+            'calculation_items': [
+                {
+                    'service_id': svc_id,
+                    'quantity': '1e30',
+                    'price_per_unit': '1',
+                    'item_total_price': '1',
+                }
+            ],
+            'grand_total_price': '1',
+        },
+    )
+    assert resp.status_code == 400
+
+
+def test_calculate_follows_price_changes(client, app):
+    svc_id = _service_id(app)
+    payload = {'items': [{'service_id': svc_id, 'quantity': 1}]}
+    assert client.post('/api/v1/calculate', json=payload).get_json()[
+        'grand_total_price'
+    ] == '1.00'
+    with app.app_context():
+        db.session.get(Service, svc_id).price = Decimal('7.25')
+        db.session.commit()
+    assert client.post('/api/v1/calculate', json=payload).get_json()[
+        'grand_total_price'
+    ] == '7.25'
+
+
+def test_send_calculation_uses_server_totals(client, app, monkeypatch):
+    sent = []
+
+    class RecordingSMTP:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def send_message(self, message):
+            sent.append(message)
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(smtplib, 'SMTP', RecordingSMTP)
+    resp = client.post(
+        '/api/v1/send-calculation',
+        json={
+            'user_email': 'user@example.com',
+            'language_code': 'en',
+            'calculation_items': [
+                {
+                    'service_id': _service_id(app),
+                    'quantity': '3',
+                    'price_per_unit': '0.01',
+                    'item_total_price': '0.03',
+                }
+            ],
+            'grand_total_price': '0.03',
+        },
+    )
+    assert resp.status_code == 202
+    with app.app_context():
+        deliver_due()
+    assert 'Total price: 3.00' in sent[0].get_body(('plain',)).get_content()
+
+
+def _ndjson(resp):
+    return [json.loads(line) for line in resp.data.splitlines()]
+
+
+def test_calculate_batch_json(client, app):
+    svc_id = _service_id(app)
+    resp = client.post(
+        '/api/v1/calculate/batch',
+        json={
+            'quotes': [
+                {'id': 'a', 'items': [{'service_id': svc_id, 'quantity': 2}]},
+                {'id': 'b', 'items': [{'service_id': 0, 'quantity': 1}]},
+                {
+                    'id': 'c',
+                    'items': [{'service_id': svc_id, 'quantity': '0.125'}],
+                },
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == 'application/x-ndjson'
+    a, b, c = _ndjson(resp)
+    assert a['id'] == 'a' and a['grand_total_price'] == '2.00'
+    assert a['items'][0]['unit'] == 'pc'
+    assert b['id'] == 'b' and 'unknown service' in b['error']
+    assert c['grand_total_price'] == '0.13'
+
+
+def test_calculate_batch_reports_overflow_per_quote(client, app):
+    svc_id = _service_id(app)
+    resp = client.post(
+        '/api/v1/calculate/batch',
+        json={
+            'quotes': [
+                {'id': 'a', 'items': [{'service_id': svc_id, 'quantity': 1e30}]},
+                {'id': 'b', 'items': [{'service_id': svc_id, 'quantity': 1}]},
+            ]
+        },
+    )
+    a, b = _ndjson(resp)
+    assert a['id'] == 'a' and 'at most' in a['error']
+    assert b['grand_total_price'] == '1.00'
+
+
+def test_calculate_batch_ndjson_and_limits(client, app):
+    app.config['BATCH_MAX_QUOTES'] = 2
+    svc_id = _service_id(app)
+    line = json.dumps({'id': 1, 'items': [{'service_id': svc_id, 'quantity': 1}]})
+    body = '\n'.join([line, 'not json', line, line]) + '\n'
+    resp = client.post(
+        '/api/v1/calculate/batch',
+        data=body,
+        content_type='application/x-ndjson',
+    )
+    first, bad, limit = _ndjson(resp)
+    assert first['grand_total_price'] == '1.00'
+    assert 'invalid JSON' in bad['error']
+    assert 'limited to 2 quotes' in limit['error']
+
+
+def test_calculate_batch_rejects_large_body(client, app):
+    app.config['BATCH_MAX_BYTES'] = 10
+    resp = client.post('/api/v1/calculate/batch', json={'quotes': []})
+    assert resp.status_code == 413
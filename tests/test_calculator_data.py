@@ -1,3 +1,12 @@
+import gzip
+import json
+import zlib
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from admin_app import db
+from admin_app.models import Category, Service
 
 def test_calculator_data_endpoint(client):
     resp = client.get('/api/v1/calculator-data')
@@ -22,3 +31,180 @@ def test_calculator_data_endpoint(client):
     assert data['currency_by_lang'].get('uk') == 'PLN'
     assert isinstance(data['units_of_measurement'], list)
     assert isinstance(data['categories'], list)
+
+
+def _count_queries(app, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+
+def test_calculator_data_cached_until_catalog_changes(client, app, login):
+    first = client.get('/api/v1/calculator-data')
+    assert first.status_code == 200
+
+    queries = _count_queries(
+        app, lambda: client.get('/api/v1/calculator-data')
+    )
+    assert queries == 0
+
+    login()
+    client.post('/categories', data={'name': 'Fresh'}, follow_redirects=True)
+    resp = client.get('/api/v1/calculator-data')
+    names = {cat['name'] for cat in resp.get_json()['categories']}
+    assert 'Fresh' in names
+
+
+def test_calculator_data_cache_ignores_rolled_back_changes(client, app):
+    client.get('/api/v1/calculator-data')
+    with app.app_context():
+        version = app.extensions['catalog_cache'].version
+        db.session.add(Category(name='Discarded'))
+        db.session.flush()
+        db.session.rollback()
+        assert app.extensions['catalog_cache'].version == version
+
+
+def test_calculator_data_conditional_get(client, app):
+    first = client.get('/api/v1/calculator-data')
+    etag = first.headers['ETag']
+    assert etag
+    assert first.headers['Last-Modified']
+    assert 'must-revalidate' in first.headers['Cache-Control']
+
+    queries = []
+
+    def revalidate():
+        queries.append(
+            client.get(
+                '/api/v1/calculator-data',
+                headers={'If-None-Match': etag},
+            )
+        )
+
+    assert _count_queries(app, revalidate) == 0
+    resp = queries[0]
+    assert resp.status_code == 304
+    assert resp.data == b''
+    assert resp.headers['ETag'] == etag
+
+
+def test_calculator_data_etag_changes_with_catalog(client, app):
+    etag = client.get('/api/v1/calculator-data').headers['ETag']
+    with app.app_context():
+        db.session.add(Category(name='Another'))
+        db.session.commit()
+    resp = client.get(
+        '/api/v1/calculator-data', headers={'If-None-Match': etag}
+    )
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+
+
+def test_calculator_data_precompressed_variants(client):
+    plain = client.get('/api/v1/calculator-data')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    gzipped = client.get(
+        '/api/v1/calculator-data',
+        headers={'Accept-Encoding': 'gzip, deflate'},
+    )
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.data) == plain.data
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+
+    deflated = client.get(
+        '/api/v1/calculator-data',
+        headers={'Accept-Encoding': 'deflate'},
+    )
+    assert deflated.headers['Content-Encoding'] == 'deflate'
+    assert zlib.decompress(deflated.data) == plain.data
+
+    resp = client.get(
+        '/api/v1/calculator-data',
+        headers={
+            'Accept-Encoding': 'gzip',
+            'If-None-Match': gzipped.headers['ETag'],
+        },
+    )
+    assert resp.status_code == 304
+
+
+def test_calculator_data_stream_matches_cached_payload(client, app):
+    with app.app_context():
+        db.session.add(Category(name='Empty'))
+        db.session.commit()
+    cached = client.get('/api/v1/calculator-data')
+    streamed = client.get('/api/v1/calculator-data?stream=1')
+    assert streamed.status_code == 200
+    assert streamed.is_streamed
+    assert streamed.data + b'\n' == cached.data
+    assert (
+        streamed.headers['X-Catalog-Version']
+        == cached.headers['X-Catalog-Version']
+    )
+
+
+def test_catalog_export_includes_uncategorized_services(client, app):
+    with app.app_context():
+        db.session.add(Service(name='Loose', price=Decimal('4.20')))
+        db.session.commit()
+    resp = client.get('/api/v1/calculator-data/export')
+    assert resp.status_code == 200
+    assert 'attachment' in resp.headers['Content-Disposition']
+    data = json.loads(resp.data)
+    assert data['version'] == int(resp.headers['X-Catalog-Version'])
+    loose = [s for s in data['services'] if s['name'] == 'Loose']
+    assert loose == [
+        {
+            'id': loose[0]['id'],
+            'name': 'Loose',
+            'price': '4.20',
+            'unit_id': None,
+            'category_id': None,
+        }
+    ]
+    assert {c['name'] for c in data['categories']} == {'Test Category'}
+
+
+def test_calculator_data_columnar_format(client, app):
+    with app.app_context():
+        cat = Category.query.first()
+        db.session.add(
+            Service(name='Cheap', price=Decimal('0.05'), category_id=cat.id)
+        )
+        db.session.commit()
+    plain = client.get('/api/v1/calculator-data').get_json()
+    resp = client.get('/api/v1/calculator-data?format=columnar')
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['format'] == 'columnar'
+    assert data['service_fields'] == ['id', 'name', 'price', 'unit_id']
+    assert data['price_scale'] == 2
+    for cat, plain_cat in zip(data['categories'], plain['categories']):
+        decoded = [
+            {
+                'id': row[0],
+                'name': row[1],
+                'price': f"{row[2] / 100:.2f}",
+                'unit_id': row[3],
+            }
+            for row in cat['services']
+        ]
+        assert decoded == plain_cat['services']
+    prices = [row[2] for row in data['categories'][0]['services']]
+    assert prices == [100, 5]
+    assert resp.headers['ETag'] != client.get(
+        '/api/v1/calculator-data'
+    ).headers['ETag']
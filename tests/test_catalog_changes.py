@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from admin_app import db
+from admin_app.changes import compact
+from admin_app.models import Category, Language, Service, CatalogChange
+
+
+def _version(client):
+    resp = client.get('/api/v1/calculator-data')
+    return int(resp.headers['X-Catalog-Version'])
+
+
+def test_changes_since_latest_version_is_empty(client):
+    version = _version(client)
+    assert version > 0
+    resp = client.get(f'/api/v1/calculator-data/changes?since={version}')
+    assert resp.status_code == 200
+    assert resp.get_json() == {
+        'version': version,
+        'resync': False,
+        'changes': [],
+    }
+
+
+def test_changes_report_net_upserts_and_deletes(client, app, login):
+    version = _version(client)
+    with app.app_context():
+        svc = Service.query.filter_by(name='Test Service').first()
+        svc_id = svc.id
+    login()
+    client.post(
+        '/categories', data={'name': 'Short lived'}, follow_redirects=True
+    )
+    with app.app_context():
+        cat_id = Category.query.filter_by(name='Short lived').first().id
+    client.post(f'/categories/delete/{cat_id}', follow_redirects=True)
+    with app.app_context():
+        svc = db.session.get(Service, svc_id)
+        svc.price = Decimal('9.99')
+        db.session.commit()
+
+    resp = client.get(f'/api/v1/calculator-data/changes?since={version}')
+    data = resp.get_json()
+    assert data['resync'] is False
+    assert data['version'] > version
+    changes = {(c['entity'], c['id']): c for c in data['changes']}
+    assert changes[('category', cat_id)]['op'] == 'delete'
+    assert changes[('service', svc_id)]['op'] == 'upsert'
+    assert changes[('service', svc_id)]['data']['price'] == '9.99'
+    assert len(data['changes']) == 2
+
+
+def test_changes_report_renamed_natural_keys(client, app):
+    version = _version(client)
+    with app.app_context():
+        lang = Language.query.filter_by(code='uk').first()
+        lang.code = 'ua'
+        db.session.commit()
+    data = client.get(
+        f'/api/v1/calculator-data/changes?since={version}'
+    ).get_json()
+    ops = {(c['id'], c['op']) for c in data['changes']}
+    assert ops == {('uk', 'delete'), ('ua', 'upsert')}
+
+
+def test_changes_request_resync_after_compaction(client, app):
+    with app.app_context():
+        for i in range(3):
+            db.session.add(Category(name=f'C{i}'))
+            db.session.commit()
+        assert compact(keep=1) > 0
+        assert CatalogChange.query.count() == 1
+    resp = client.get('/api/v1/calculator-data/changes?since=0')
+    assert resp.get_json()['resync'] is True
+
+
+def test_changes_requires_since(client):
+    resp = client.get('/api/v1/calculator-data/changes')
+    assert resp.status_code == 400
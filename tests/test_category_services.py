@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from admin_app import db
+from admin_app.models import Category, Service
+
+
+def test_bootstrap_returns_category_headers(client, app):
+    resp = client.get('/api/v1/calculator-data/bootstrap')
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert {'settings', 'languages', 'currencies', 'units_of_measurement'} <= (
+        set(data)
+    )
+    cat = data['categories'][0]
+    assert cat['name'] == 'Test Category'
+    assert cat['service_count'] == 1
+    assert 'services' not in cat
+
+
+def test_category_services_keyset_pagination(client, app):
+    with app.app_context():
+        cat = Category.query.first()
+        cat_id = cat.id
+        db.session.add_all(
+            Service(name=f'S{i}', price=Decimal('1.50'), category_id=cat_id)
+            for i in range(5)
+        )
+        db.session.commit()
+        expected = [
+            s.id for s in Service.query.filter_by(category_id=cat_id)
+            .order_by(Service.id)
+        ]
+
+    seen = []
+    after = 0
+    while True:
+        resp = client.get(
+            f'/api/v1/categories/{cat_id}/services?limit=2&after={after}'
+        )
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert len(data['services']) <= 2
+        seen.extend(s['id'] for s in data['services'])
+        if data['next_after'] is None:
+            break
+        after = data['next_after']
+    assert seen == expected
+
+
+def test_category_services_first_page_is_cached(client, app):
+    with app.app_context():
+        cat_id = Category.query.first().id
+    first = client.get(f'/api/v1/categories/{cat_id}/services')
+    assert first.status_code == 200
+    assert first.get_json()['services'][0]['name'] == 'Test Service'
+    resp = client.get(
+        f'/api/v1/categories/{cat_id}/services',
+        headers={'If-None-Match': first.headers['ETag']},
+    )
+    assert resp.status_code == 304
+
+
+def test_category_services_unknown_category(client):
+    resp = client.get('/api/v1/categories/9999/services')
+    assert resp.status_code == 404
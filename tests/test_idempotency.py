@@ -0,0 +1,80 @@
+from admin_app.idempotency import IdempotencyStore
+from admin_app.models import OutboxMessage
+
+
+def _payload(total='2'):
+    return {
+        'user_email': 'user@example.com',
+        'language_code': 'en',
+        'calculation_items': [
+            {'quantity': '1', 'price_per_unit': '2', 'item_total_price': '2'}
+        ],
+        'grand_total_price': total,
+    }
+
+
+def _outbox_size(app):
+    with app.app_context():
+        return OutboxMessage.query.count()
+
+
+def test_repeated_submission_is_sent_once(client, app):
+    first = client.post('/api/v1/send-calculation', json=_payload())
+    second = client.post('/api/v1/send-calculation', json=_payload())
+    assert first.status_code == second.status_code == 202
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_json() == first.get_json()
+    assert _outbox_size(app) == 1
+    third = client.post('/api/v1/send-calculation', json=_payload('3'))
+    assert 'Idempotent-Replayed' not in third.headers
+    assert _outbox_size(app) == 2
+
+
+def test_idempotency_key_header(client, app):
+    url = '/api/v1/send-calculation'
+    first = client.post(
+        url, json=_payload('1'), headers={'Idempotency-Key': 'abc'}
+    )
+    replay = client.post(
+        url, json=_payload('5'), headers={'Idempotency-Key': 'abc'}
+    )
+    assert replay.get_json()['message_id'] == first.get_json()['message_id']
+    other = client.post(
+        url, json=_payload('1'), headers={'Idempotency-Key': 'def'}
+    )
+    assert other.get_json()['message_id'] != first.get_json()['message_id']
+    assert _outbox_size(app) == 2
+
+
+def test_errors_are_not_replayed(client, app):
+    payload = dict(_payload(), user_email='invalid')
+    for _ in range(2):
+        resp = client.post('/api/v1/send-calculation', json=payload)
+        assert resp.status_code == 400
+        assert 'Idempotent-Replayed' not in resp.headers
+
+
+def test_store_expires_and_bounds_entries():
+    store = IdempotencyStore(max_entries=2)
+    assert store.begin('a', ttl=0) is None
+    store.finish('a', 202, b'{}', 'application/json')
+    assert store.begin('a', ttl=60) is None  # expired immediately
+    store.finish('a', 202, b'{}', 'application/json')
+    assert store.begin('a', ttl=60).body == b'{}'
+    for key in ('b', 'c'):
+        store.begin(key, ttl=60)
+        store.finish(key, 202, b'{}', 'application/json')
+    stats = store.stats()
+    assert stats['entries'] == 2
+    assert stats['hits'] == 1 and stats['misses'] == 4
+    assert stats['hit_rate'] == 0.2
+
+
+def test_idempotency_stats_require_login(client, login):
+    assert client.get('/stats/idempotency').status_code == 302
+    login()
+    client.post('/api/v1/send-calculation', json=_payload())
+    client.post('/api/v1/send-calculation', json=_payload())
+    stats = client.get('/stats/idempotency').get_json()
+    assert stats['hits'] == 1
+    assert stats['hit_rate'] == 0.5
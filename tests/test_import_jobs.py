@@ -0,0 +1,202 @@
+import time
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from admin_app import create_app, db
+from admin_app.import_jobs import (
+    Progress,
+    _utcnow,
+    fail_stale,
+    get_worker,
+    job_status,
+    submit,
+)
+from admin_app.importer import ServiceImporter
+from admin_app.models import ImportJob, Service
+from admin_app.utils.io import FileTooLarge
+from config import Config
+
+
+def _upload(client, data):
+    return client.post(
+        '/services/import',
+        data={'file': (BytesIO(data), 'services.csv')},
+        content_type='multipart/form-data',
+    )
+
+
+def test_import_runs_on_worker_thread(client, app, login, tmp_path):
+    app.config['IMPORT_WORKERS'] = 1
+    app.config['IMPORT_UPLOAD_DIR'] = str(tmp_path)
+    login()
+    rows = ''.join(f'svc {i},{i},Cat,pc\n' for i in range(500))
+    _upload(client, ('name,price,category,unit\n' + rows + ',1,,\n').encode())
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = client.get('/services/import/1').get_json()
+            if job['state'] not in ('pending', 'running'):
+                break
+            time.sleep(0.05)
+    finally:
+        with app.app_context():
+            get_worker().stop(5)
+    assert job['state'] == 'done'
+    assert (job['rows'], job['inserted'], job['errors']) == (501, 500, 1)
+    assert client.get('/services/import/1/errors').text == (
+        'Row 502: Missing data'
+    )
+    assert list(tmp_path.iterdir()) == []
+    with app.app_context():
+        assert Service.query.count() == 501
+
+
+def test_status_reports_live_progress(app):
+    with app.app_context():
+        job = ImportJob(filename='a.csv', path='a.csv', status='running')
+        db.session.add(job)
+        db.session.commit()
+        progress = Progress()
+        progress.rows = 300
+        progress.started -= 2
+        app.extensions['import_progress'] = {job.id: progress}
+        status = job_status(job)
+        assert status['state'] == 'running'
+        assert status['rows'] == 300
+        assert 140 <= status['rows_per_second'] <= 150
+
+
+def test_services_page_lists_imports(client, login):
+    login()
+    _upload(client, b'name,price,category,unit\nA,1,,\n')
+    resp = client.get('/services')
+    assert 'data-job-url="/services/import/1"' in resp.text
+    assert client.get('/services/import/2').status_code == 404
+
+
+def test_import_commits_every_n_rows(client, app, login):
+    login()
+    app.config['IMPORT_FALLBACK_ENCODING'] = 'ascii'
+    rows = ''.join(f'svc {i},{i},Cat,pc\n' for i in range(2000))
+    data = ('name,price,category,unit\n' + rows).encode() + b'\xff,1,,\n'
+    app.config['IMPORT_COMMIT_EVERY'] = 0
+    _upload(client, data)
+    app.config['IMPORT_COMMIT_EVERY'] = 500
+    _upload(client, data)
+    whole = client.get('/services/import/1').get_json()
+    chunked = client.get('/services/import/2').get_json()
+    assert (whole['state'], whole['inserted']) == ('failed', 0)
+    assert chunked['state'] == 'failed'
+    assert 0 < chunked['inserted'] < 2000
+    assert chunked['inserted'] % 500 == 0
+    with app.app_context():
+        assert Service.query.count() == 1 + chunked['inserted']
+
+
+def test_failed_import_reports_committed_chunks(
+    client, app, login, monkeypatch
+):
+    add = ServiceImporter.add
+
+    def failing_add(self, row, line_num):
+        if row['name'] == 'boom':
+            raise RuntimeError('boom')
+        return add(self, row, line_num)
+
+    monkeypatch.setattr(ServiceImporter, 'add', failing_add)
+    login()
+    app.config['IMPORT_COMMIT_EVERY'] = 3
+    _upload(
+        client,
+        b'name,price,category,unit\n'
+        b'A,1,,\nTest Service,2,,\n,1,,\n'
+        b'B,1,,\n,x,,\nboom,1,,\n',
+    )
+    job = client.get('/services/import/1').get_json()
+    assert (job['state'], job['message']) == ('failed', 'Import failed')
+    assert (job['rows'], job['inserted'], job['updated']) == (3, 1, 1)
+    assert job['errors'] == 1
+    assert client.get('/services/import/1/errors').text == (
+        'Row 4: Missing data'
+    )
+    with app.app_context():
+        assert sorted(s.name for s in Service.query) == ['A', 'Test Service']
+
+
+def _pragmas(app):
+    with app.app_context():
+        mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        timeout = db.session.execute(db.text('PRAGMA busy_timeout')).scalar()
+        db.session.remove()
+    return mode, timeout
+
+
+def test_sqlite_uses_wal(monkeypatch, tmp_path):
+    uri = f'sqlite:///{tmp_path / "wal.db"}'
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', uri)
+    assert _pragmas(create_app()) == ('wal', 15000)
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    assert _pragmas(create_app()) == ('memory', 15000)
+
+
+def test_submit_rejects_large_upload(app, tmp_path):
+    app.config['IMPORT_MAX_BYTES'] = 100
+    app.config['IMPORT_UPLOAD_DIR'] = str(tmp_path)
+    data = b'name,price,category,unit\n' + b'x,1,,\n' * 50
+    with app.test_request_context():
+        with pytest.raises(FileTooLarge):
+            submit(FileStorage(BytesIO(data), filename='a.csv'))
+        assert ImportJob.query.count() == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stale_running_job_is_failed(app, tmp_path):
+    app.config['IMPORT_LEASE'] = 60
+    upload = tmp_path / 'a.csv'
+    upload.write_bytes(b'name,price,category,unit\n')
+    with app.app_context():
+        old = _utcnow() - timedelta(seconds=120)
+        stale = ImportJob(
+            filename='a.csv',
+            path=str(upload),
+            status='running',
+            inserted=500,
+            heartbeat_at=old,
+        )
+        alive = ImportJob(
+            filename='b.csv', path='b.csv', status='running', heartbeat_at=old
+        )
+        fresh = ImportJob(
+            filename='c.csv',
+            path='c.csv',
+            status='running',
+            heartbeat_at=_utcnow(),
+        )
+        db.session.add_all([stale, alive, fresh])
+        db.session.commit()
+        app.extensions['import_progress'] = {alive.id: Progress()}
+        assert fail_stale() == 1
+        assert fail_stale() == 0
+        job = db.session.get(ImportJob, stale.id)
+        assert (job.status, job.message) == ('failed', 'Import interrupted')
+        assert job.inserted == 500
+        assert db.session.get(ImportJob, alive.id).status == 'running'
+        assert db.session.get(ImportJob, fresh.id).status == 'running'
+    assert not upload.exists()
+
+
+def test_import_caps_stored_errors(client, app, login):
+    login()
+    app.config['IMPORT_MAX_ERRORS'] = 3
+    rows = ',1,,\n' * 10 + 'ok,1,,\n'
+    _upload(client, ('name,price,category,unit\n' + rows).encode())
+    job = client.get('/services/import/1').get_json()
+    assert (job['state'], job['errors'], job['inserted']) == ('done', 10, 1)
+    assert client.get('/services/import/1/errors').text.splitlines() == [
+        'Row 2: Missing data',
+        'Row 3: Missing data',
+        'Row 4: Missing data',
+    ]
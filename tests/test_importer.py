@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from admin_app import db
+from admin_app.importer import ServiceImporter
+from admin_app.models import (
+    CatalogChange,
+    Category,
+    Service,
+    UnitOfMeasurement,
+)
+from tests.test_calculator_data import _count_queries
+
+
+def _row(name, price='1', category='', unit='', id=''):
+    return {
+        'id': id,
+        'name': name,
+        'price': price,
+        'category': category,
+        'unit': unit,
+    }
+
+
+def test_importer_matches_names_and_ids(app):
+    with app.app_context():
+        svc_id = Service.query.filter_by(name='Test Service').first().id
+        importer = ServiceImporter(db.session, batch_size=2)
+        rows = [
+            _row('A', '1', 'New Cat', 'nu'),
+            _row('a', '2', 'new cat', 'NU'),
+            _row('B', '3', 'Test Category', 'pc'),
+            _row('Renamed', '4', id=str(svc_id)),
+            _row('test service', '5', id='999'),
+            _row('renamed', '6', 'New Cat'),
+            _row('C', 'x'),
+            _row('D', '1', id='y'),
+        ]
+        errors = [importer.add(row, i) for i, row in enumerate(rows, 2)]
+        importer.flush()
+        db.session.commit()
+        assert errors[-2:] == ['Row 8: Invalid price', 'Row 9: Invalid id']
+        assert (importer.inserted, importer.updated) == (3, 2)
+
+        services = {s.name: s for s in Service.query}
+        assert set(services) == {'A', 'B', 'Renamed', 'test service'}
+        cat = Category.query.filter_by(name='New Cat').one()
+        unit = UnitOfMeasurement.query.filter_by(abbreviation='nu').one()
+        assert services['A'].price == Decimal('2.00')
+        assert services['A'].category_id == cat.id
+        assert services['A'].unit_id == unit.id
+        assert services['Renamed'].id == svc_id
+        assert services['Renamed'].price == Decimal('6.00')
+        assert services['Renamed'].category_id == cat.id
+        assert services['Renamed'].unit_id is None
+
+        logged = {
+            (c.entity, c.entity_id) for c in CatalogChange.query
+        }
+        assert ('service', str(services['A'].id)) in logged
+        assert ('service', str(svc_id)) in logged
+        assert ('category', str(cat.id)) in logged
+        assert ('unit', str(unit.id)) in logged
+
+
+def test_importer_query_count_does_not_depend_on_rows(app):
+    def run(count, start):
+        with app.app_context():
+            importer = ServiceImporter(db.session, batch_size=10000)
+            for i in range(start, start + count):
+                importer.add(
+                    _row(f'svc {i}', '1', f'cat {i}', f'u{i}'), i
+                )
+            importer.flush()
+            db.session.commit()
+
+    few = _count_queries(app, lambda: run(3, 0))
+    many = _count_queries(app, lambda: run(300, 3))
+    assert few == many
+    with app.app_context():
+        assert Service.query.count() == 304
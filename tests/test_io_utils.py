@@ -1,7 +1,18 @@
-from io import StringIO
+import gzip
+from io import BytesIO, StringIO
 from collections import namedtuple
 
-from admin_app.utils.io import export_csv, import_csv
+import pytest
+
+from admin_app.utils.io import (
+    FileTooLarge,
+    detect_encoding,
+    export_csv,
+    gzip_stream,
+    import_csv,
+    iter_csv,
+    open_text,
+)
 
 
 def test_export_csv_basic():
@@ -14,6 +25,25 @@ def test_export_csv_basic():
     assert data.strip().splitlines() == ['id,name', '1,a', '2,b']
 
 
+def test_iter_csv_yields_header_first_and_bounded_blocks():
+    def rows():
+        yield from range(1000)
+        raise AssertionError('rows must be consumed lazily')
+
+    chunks = iter_csv(rows(), [('n', lambda n: n)], size=100)
+    assert next(chunks) == 'n\r\n'
+    blocks = [next(chunks) for _ in range(5)]
+    assert all(100 <= len(block) < 110 for block in blocks)
+    assert ''.join(blocks).splitlines()[:2] == ['0', '1']
+
+
+def test_gzip_stream_round_trip():
+    chunks = [b'header\n'] + [b'row %d\n' % i for i in range(1000)]
+    compressed = list(gzip_stream(iter(chunks)))
+    assert compressed[0]
+    assert gzip.decompress(b''.join(compressed)) == b''.join(chunks)
+
+
 def test_import_csv_validators_and_upsert():
     csv_data = 'a,b\n1,2\n3,x\n'
     stream = StringIO(csv_data)
@@ -45,3 +75,52 @@ def test_import_csv_missing_columns():
 
     errors = import_csv(stream, [validator], lambda row, ln: None)
     assert errors == ['missing']
+
+
+def test_detect_encoding():
+    assert detect_encoding(b'\xef\xbb\xbfa,b') == 'utf-8-sig'
+    assert detect_encoding('a,b'.encode('utf-16')) == 'utf-16'
+    assert detect_encoding('a,b'.encode('utf-32')) == 'utf-32'
+    assert detect_encoding('ціна'.encode('utf-8')[:-1]) == 'utf-8'
+    assert detect_encoding('ціна'.encode('cp1251')) == 'cp1251'
+    assert detect_encoding(b'\xff', fallback='latin-1') == 'latin-1'
+
+
+def test_import_csv_caps_collected_errors():
+    stream = StringIO('name\n' + 'x\n' * 100)
+    calls = []
+
+    def upsert(row, line_num):
+        calls.append(line_num)
+        return f'Row {line_num}: bad'
+
+    errors = import_csv(stream, [], upsert, max_errors=2)
+    assert errors == ['Row 2: bad', 'Row 3: bad']
+    assert len(calls) == 100
+
+
+@pytest.mark.parametrize(
+    'encoding', ['utf-8', 'utf-8-sig', 'utf-16', 'cp1251']
+)
+def test_open_text_decodes_lines_incrementally(encoding):
+    text = 'name,price\r\n' + ''.join(
+        f'"Послуга\n{i}",{i}\r\n' for i in range(20000)
+    )
+    stream = open_text(BytesIO(text.encode(encoding)))
+    rows = []
+    errors = import_csv(
+        stream, [], lambda row, ln: rows.append((row['name'], row['price']))
+    )
+    assert errors == []
+    assert len(rows) == 20000
+    assert rows[-1] == ('Послуга\n19999', '19999')
+
+
+def test_open_text_enforces_max_bytes():
+    data = b'name\n' + b'x\n' * 100000
+    stream = open_text(BytesIO(data), max_bytes=len(data))
+    assert sum(1 for _ in stream) == 100001
+    stream = open_text(BytesIO(data), max_bytes=len(data) - 1)
+    with pytest.raises(FileTooLarge):
+        for _ in stream:
+            pass
@@ -1,4 +1,7 @@
-from admin_app.models import User
+from sqlalchemy import func, select
+
+from admin_app import db
+from admin_app.models import Service, User
 
 
 def test_password_hashing():
@@ -6,3 +9,24 @@ def test_password_hashing():
     user.set_password('secret')
     assert user.check_password('secret')
     assert not user.check_password('wrong')
+
+
+def _plan(statement):
+    compiled = statement.compile(
+        db.engine, compile_kwargs={'literal_binds': True}
+    )
+    rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {compiled}'))
+    return ' '.join(row[-1] for row in rows)
+
+
+def test_service_lookups_use_indexes(app):
+    lookups = {
+        'ix_service_name_lower': func.lower(Service.name) == 'test service',
+        'ix_service_category_id': Service.category_id == 1,
+        'ix_service_unit_id': Service.unit_id == 1,
+    }
+    with app.app_context():
+        for index, condition in lookups.items():
+            plan = _plan(select(Service.id).where(condition))
+            assert plan.startswith('SEARCH service USING')
+            assert f'INDEX {index} (' in plan
@@ -0,0 +1,182 @@
+import json
+import smtplib
+from datetime import timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import select, update
+
+from admin_app import db
+from admin_app.models import OutboxMessage
+from admin_app.outbox import (
+    FAILED,
+    PENDING,
+    SENT,
+    _utcnow,
+    deliver_due,
+    enqueue,
+    retry_delay,
+)
+
+
+class FlakySMTP:
+    failures = 0
+    sent = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_message(self, message):
+        if FlakySMTP.failures:
+            FlakySMTP.failures -= 1
+            raise smtplib.SMTPServerDisconnected('gone')
+        FlakySMTP.sent.append(message)
+
+
+def _message(to='user@example.com'):
+    message = EmailMessage()
+    message['From'] = 'no-reply@example.com'
+    message['To'] = to
+    message['Subject'] = 'Calculation Results'
+    message.set_content('Total price: 1.00')
+    return message
+
+
+def _make_due(message_id):
+    entry = db.session.get(OutboxMessage, message_id)
+    entry.next_attempt_at = _utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_retry_delay_backs_off_exponentially(app):
+    with app.app_context():
+        app.config.update(OUTBOX_RETRY_BASE=30, OUTBOX_RETRY_MAX=100)
+        assert [retry_delay(n) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+def test_outbox_retries_until_sent(app, monkeypatch):
+    FlakySMTP.failures = 2
+    FlakySMTP.sent = []
+    monkeypatch.setattr(smtplib, 'SMTP', FlakySMTP)
+    with app.app_context():
+        message_id = enqueue(_message()).id
+        for _ in range(3):
+            assert deliver_due() == 1
+            _make_due(message_id)
+        entry = db.session.get(OutboxMessage, message_id)
+        assert entry.status == SENT
+        assert entry.attempts == 3
+        assert entry.last_error is None
+        assert entry.sent_at is not None
+    assert FlakySMTP.sent[0]['To'] == 'user@example.com'
+
+
+def test_outbox_gives_up_after_max_attempts(app, monkeypatch):
+    FlakySMTP.failures = 10
+    monkeypatch.setattr(smtplib, 'SMTP', FlakySMTP)
+    with app.app_context():
+        app.config['OUTBOX_MAX_ATTEMPTS'] = 2
+        message_id = enqueue(_message()).id
+        deliver_due()
+        assert db.session.get(OutboxMessage, message_id).status == PENDING
+        _make_due(message_id)
+        deliver_due()
+        _make_due(message_id)
+        assert deliver_due() == 0
+        entry = db.session.get(OutboxMessage, message_id)
+        assert entry.status == FAILED
+        assert entry.attempts == 2
+
+
+def test_outbox_reclaims_expired_lease(app, monkeypatch):
+    FlakySMTP.failures = 0
+    FlakySMTP.sent = []
+    monkeypatch.setattr(smtplib, 'SMTP', FlakySMTP)
+    with app.app_context():
+        message_id = enqueue(_message()).id
+        entry = db.session.get(OutboxMessage, message_id)
+        entry.status = 'sending'
+        entry.next_attempt_at = _utcnow() + timedelta(seconds=60)
+        db.session.commit()
+        assert deliver_due() == 0
+        _make_due(message_id)
+        assert deliver_due() == 1
+        assert db.session.get(OutboxMessage, message_id).status == SENT
+
+
+class TakeoverSMTP(FlakySMTP):
+    """Records, for each send, which messages are committed as sent."""
+
+    seen = []
+
+    def send_message(self, message):
+        with db.engine.connect() as connection:
+            TakeoverSMTP.seen.append(
+                connection.execute(
+                    select(OutboxMessage.id).where(
+                        OutboxMessage.status == SENT
+                    )
+                ).scalars().all()
+            )
+        if len(TakeoverSMTP.seen) == 2:
+            # Sending took longer than the lease: another worker claims the
+            # last message.
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id == 3)
+                    .values(next_attempt_at=_utcnow())
+                )
+        FlakySMTP.sent.append(message)
+
+
+def test_outbox_commits_each_message_and_stops_when_lease_is_lost(
+    app, monkeypatch
+):
+    FlakySMTP.sent = []
+    TakeoverSMTP.seen = []
+    monkeypatch.setattr(smtplib, 'SMTP', TakeoverSMTP)
+    with app.app_context():
+        for _ in range(3):
+            enqueue(_message())
+        assert deliver_due() == 2
+        assert TakeoverSMTP.seen == [[], [1]]
+        statuses = [m.status for m in OutboxMessage.query.order_by('id')]
+        assert statuses == [SENT, SENT, 'sending']
+        assert len(FlakySMTP.sent) == 2
+
+
+def test_send_calculation_status_unknown(client, app):
+    resp = client.get('/api/v1/send-calculation/999')
+    assert resp.status_code == 404
+    with app.app_context():
+        entry = enqueue(_message())
+        message_id, token = entry.id, entry.token
+    assert len(token) == 32
+    resp = client.get(f'/api/v1/send-calculation/{message_id}')
+    assert resp.status_code == 404
+    resp = client.get(f'/api/v1/send-calculation/{token}')
+    assert resp.get_json()['message_id'] == token
+
+
+class RefusingSMTP(FlakySMTP):
+    def send_message(self, message):
+        raise smtplib.SMTPRecipientsRefused(
+            {message['To']: (550, b'5.1.1 no such user')}
+        )
+
+
+def test_refused_recipient_reports_error_category(client, app, monkeypatch):
+    monkeypatch.setattr(smtplib, 'SMTP', RefusingSMTP)
+    with app.app_context():
+        token = enqueue(_message('victim@example.com')).token
+        deliver_due()
+    status = client.get(f'/api/v1/send-calculation/{token}').get_json()
+    assert status['state'] == FAILED
+    assert status['error'] == 'recipient_refused'
+    assert 'victim' not in json.dumps(status)
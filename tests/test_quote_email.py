@@ -0,0 +1,131 @@
+import smtplib
+
+from admin_app.emails import quote_email
+from admin_app.models import Service
+from admin_app.outbox import deliver_due
+
+
+class RecordingSMTP:
+    sent = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def send_message(self, message):
+        RecordingSMTP.sent.append(message)
+
+    def quit(self):
+        pass
+
+
+def _send(client, app, monkeypatch, **extra):
+    RecordingSMTP.sent = []
+    monkeypatch.setattr(smtplib, 'SMTP', RecordingSMTP)
+    with app.app_context():
+        service_id = Service.query.filter_by(name='Test Service').first().id
+    payload = {
+        'user_email': 'user@example.com',
+        'language_code': 'en',
+        'calculation_items': [
+            {
+                'service_id': service_id,
+                'quantity': '2',
+                'price_per_unit': '1.00',
+                'item_total_price': '2.00',
+            }
+        ],
+        'grand_total_price': '2.00',
+    }
+    payload.update(extra)
+    resp = client.post('/api/v1/send-calculation', json=payload)
+    with app.app_context():
+        deliver_due()
+    return resp
+
+
+def test_quote_email_lists_items_with_unit_and_currency(
+    client, app, monkeypatch
+):
+    resp = _send(client, app, monkeypatch, currency_code='USD')
+    assert resp.status_code == 202
+    message = RecordingSMTP.sent[0]
+    assert message['Subject'] == 'Calculation Results'
+    text = message.get_body(('plain',)).get_content()
+    assert 'Test Service: 2 pc x 1.00 $ = 2.00 $' in text
+    assert 'Total price: 2.00 $' in text
+    html = message.get_body(('html',)).get_content()
+    assert '<td>Test Service</td>' in html
+    assert '<td>pc</td>' in html
+
+
+def test_quote_email_uses_requested_language(client, app, monkeypatch):
+    _send(client, app, monkeypatch, language_code='uk')
+    message = RecordingSMTP.sent[0]
+    assert message['Subject'] == 'Результати розрахунку'
+    assert 'Загальна сума: 2.00' in message.get_body(
+        ('plain',)
+    ).get_content()
+
+
+def test_quote_email_rejects_unknown_currency(client, app, monkeypatch):
+    resp = _send(client, app, monkeypatch, currency_code='XXX')
+    assert resp.status_code == 400
+    assert RecordingSMTP.sent == []
+
+
+def test_quote_email_escapes_html(app):
+    with app.app_context():
+        email = quote_email('en')
+        text, html = email.render_bodies(
+            [
+                {
+                    'name': '<b>Tiles & grout</b>',
+                    'unit': 'm²',
+                    'quantity': '1',
+                    'price_per_unit': '5.00',
+                    'item_total_price': '5.00',
+                }
+            ],
+            '5.00',
+            '<$>',
+        )
+        assert '<b>Tiles & grout</b>' in text
+        assert '&lt;b&gt;Tiles &amp; grout&lt;/b&gt;' in html
+        assert '<b>' not in html
+        assert '5.00 &lt;$&gt;' in html
+        assert html.count('5.00 &lt;$&gt;') == 3
+        assert '&amp;lt;' not in html
+        _, html = email.render_bodies([], '1.00', 'R&D')
+        assert '1.00 R&amp;D' in html
+        assert '&amp;amp;' not in html
+        assert quote_email('en') is email
+
+
+def test_quote_email_legacy_items_without_service_ids(
+    client, app, monkeypatch
+):
+    RecordingSMTP.sent = []
+    monkeypatch.setattr(smtplib, 'SMTP', RecordingSMTP)
+    resp = client.post(
+        '/api/v1/send-calculation',
+        json={
+            'user_email': 'user@example.com',
+            'language_code': 'en',
+            'calculation_items': [
+                {
+                    'name': 'Visit http://spam.example',
+                    'quantity': '1',
+                    'price_per_unit': '2',
+                    'item_total_price': '2',
+                }
+            ],
+            'grand_total_price': '2',
+        },
+    )
+    assert resp.status_code == 202
+    with app.app_context():
+        deliver_due()
+    text = RecordingSMTP.sent[0].get_body(('plain',)).get_content()
+    assert 'Total price: 2 $' in text
+    assert 'Service 1: 1 x 2 $' in text
+    assert 'spam' not in RecordingSMTP.sent[0].as_string()
@@ -0,0 +1,86 @@
+import pytest
+
+from admin_app.ratelimit import (
+    MemoryBackend,
+    RateLimiter,
+    SQLiteBackend,
+    parse_limit,
+)
+
+
+def test_parse_limit():
+    assert parse_limit('10/minute') == (10, 10 / 60)
+    assert parse_limit('5/10minutes') == (5, 5 / 600)
+    with pytest.raises(ValueError):
+        parse_limit('often')
+
+
+def test_memory_backend_refills_and_evicts_lru():
+    backend = MemoryBackend(max_keys=2)
+    assert backend.hit('a', 1, 1000.0) == 0
+    assert backend.hit('b', 1, 0.001) == 0
+    assert backend.hit('b', 1, 0.001) > 0
+    backend.hit('c', 1, 0.001)
+    # 'a' was least recently used and has been evicted.
+    assert list(backend._buckets) == ['b', 'c']
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / 'limits.db')
+    first = RateLimiter(SQLiteBackend(path), {'send-ip': '2/hour'})
+    second = RateLimiter(SQLiteBackend(path), {'send-ip': '2/hour'})
+    assert first.hit('send-ip', '1.2.3.4') == 0
+    assert second.hit('send-ip', '1.2.3.4') == 0
+    assert first.hit('send-ip', '1.2.3.4') == pytest.approx(1800, abs=1)
+    assert second.hit('send-ip', '5.6.7.8') == 0
+
+
+def _payload(email='user@example.com', total='2'):
+    return {
+        'user_email': email,
+        'language_code': 'en',
+        'calculation_items': [
+            {'quantity': '1', 'price_per_unit': '2', 'item_total_price': '2'}
+        ],
+        'grand_total_price': total,
+    }
+
+
+def test_send_calculation_limited_per_recipient(client, app):
+    app.config['RATELIMIT_SEND_PER_EMAIL'] = '2/hour'
+    for total in ('1', '2'):
+        resp = client.post(
+            '/api/v1/send-calculation', json=_payload(total=total)
+        )
+        assert resp.status_code == 202
+    resp = client.post(
+        '/api/v1/send-calculation', json=_payload('USER@example.com', '3')
+    )
+    assert resp.status_code == 429
+    assert int(resp.headers['Retry-After']) > 0
+    assert resp.get_json()['status'] == 'error'
+    resp = client.post(
+        '/api/v1/send-calculation', json=_payload('other@example.com')
+    )
+    assert resp.status_code == 202
+
+
+def test_calculator_data_limited_per_ip(client, app):
+    app.config['RATELIMIT_DATA_PER_IP'] = '2/minute'
+    assert client.get('/api/v1/calculator-data').status_code == 200
+    assert client.get('/api/v1/calculator-data').status_code == 200
+    resp = client.get('/api/v1/calculator-data')
+    assert resp.status_code == 429
+    assert resp.headers['Retry-After'] == '30'
+    other = client.get(
+        '/api/v1/calculator-data', environ_base={'REMOTE_ADDR': '10.0.0.2'}
+    )
+    assert other.status_code == 200
+
+
+def test_rate_limits_can_be_disabled(client, app):
+    app.config.update(
+        RATELIMIT_ENABLED=False, RATELIMIT_DATA_PER_IP='1/minute'
+    )
+    for _ in range(3):
+        assert client.get('/api/v1/calculator-data').status_code == 200
@@ -0,0 +1,137 @@
+import re
+
+from admin_app.schema import (
+    Array,
+    Code,
+    Integer,
+    Number,
+    Object,
+    Schema,
+    String,
+    format_path,
+)
+
+SCHEMA = Schema(
+    Object(
+        {
+            'email': String(
+                pattern=re.compile(r'[^@]+@[^@]+'), message='bad email'
+            ),
+            'lang': Code(lambda: {'en', 'pl'}, message='bad lang'),
+            'items': Array(
+                Object(
+                    {
+                        'id': Integer(required=False, message='bad id'),
+                        'qty': Number(message='bad qty', missing='no qty'),
+                    },
+                    message='bad item',
+                ),
+                min_items=1,
+                message='no items',
+            ),
+        },
+        message='not an object',
+    )
+)
+
+
+def test_valid_payload():
+    assert SCHEMA.validate(
+        {
+            'email': 'a@b',
+            'lang': 'pl',
+            'items': [
+                {'qty': 1},
+                {'qty': '2.5', 'id': '7'},
+                {'qty': ' -1e3 ', 'id': 3},
+                {'qty': 0.5},
+            ],
+        }
+    ) == []
+
+
+def test_reports_every_error_with_path():
+    errors = SCHEMA.validate(
+        {
+            'email': 'nope',
+            'lang': 'de',
+            'items': [{'qty': 'abc', 'id': True}, 'x', {'qty': None}],
+        }
+    )
+    assert errors == [
+        {'field': 'email', 'message': 'bad email'},
+        {'field': 'lang', 'message': 'bad lang'},
+        {'field': 'items[0].id', 'message': 'bad id'},
+        {'field': 'items[0].qty', 'message': 'bad qty'},
+        {'field': 'items[1]', 'message': 'bad item'},
+        {'field': 'items[2].qty', 'message': 'no qty'},
+    ]
+
+
+def test_rejects_non_numbers():
+    for value in [
+        '',
+        'nan',
+        'inf',
+        '1.2.3',
+        '1_000',
+        True,
+        [],
+        {},
+        float('nan'),
+        float('inf'),
+        float('-inf'),
+    ]:
+        errors = SCHEMA.validate(
+            {'email': 'a@b', 'lang': 'en', 'items': [{'qty': value}]}
+        )
+        assert errors == [{'field': 'items[0].qty', 'message': 'bad qty'}]
+
+
+def test_rejects_non_ascii_digits():
+    for value in ['²', '1²', '1.²', '٣', '1e²']:
+        errors = SCHEMA.validate(
+            {
+                'email': 'a@b',
+                'lang': 'en',
+                'items': [{'id': value, 'qty': value}],
+            }
+        )
+        assert errors == [
+            {'field': 'items[0].id', 'message': 'bad id'},
+            {'field': 'items[0].qty', 'message': 'bad qty'},
+        ]
+
+
+def test_missing_and_wrong_types():
+    assert SCHEMA.validate([]) == [{'field': '', 'message': 'not an object'}]
+    assert [e['field'] for e in SCHEMA.validate({'items': []})] == [
+        'email',
+        'lang',
+        'items',
+    ]
+
+
+def test_format_path():
+    assert format_path(((((), 'a'), 0), 'b')) == 'a[0].b'
+
+
+def test_send_calculation_reports_all_errors(client):
+    resp = client.post(
+        '/api/v1/send-calculation',
+        json={
+            'user_email': 'bad',
+            'language_code': 'xx',
+            'calculation_items': [{'quantity': 'a', 'price_per_unit': 1}],
+        },
+    )
+    assert resp.status_code == 400
+    data = resp.get_json()
+    assert data['message'] == data['errors'][0]['message']
+    assert [e['field'] for e in data['errors']] == [
+        'user_email',
+        'language_code',
+        'calculation_items[0].quantity',
+        'calculation_items[0].item_total_price',
+        'grand_total_price',
+    ]
@@ -1,11 +1,28 @@
 import csv
+import gzip
+import re
 from io import StringIO, BytesIO
 from decimal import Decimal
 
-from admin_app.models import Service, Category, UnitOfMeasurement
+from admin_app.models import ImportJob, Service, Category, UnitOfMeasurement
 from sqlalchemy import func
 
 
+def _import(client, data, filename='services.csv'):
+    """Upload ``data``; return the flashed messages and the job status."""
+    client.post(
+        '/services/import',
+        data={'file': (BytesIO(data), filename)},
+        content_type='multipart/form-data',
+    )
+    with client.session_transaction() as sess:
+        messages = [m for _c, m in sess.pop('_flashes', [])]
+    match = re.match(r'Import (\d+) ', messages[0])
+    if match is None:
+        return messages, None
+    return messages, client.get(f'/services/import/{match[1]}').get_json()
+
+
 def test_export_services_csv(client, app, login):
     login()
     resp = client.get('/services/export')
@@ -23,6 +40,35 @@ def test_export_services_csv(client, app, login):
     assert ids == {row['id'] for row in rows}
 
 
+def test_export_services_csv_streams_gzip(client, app, login):
+    login()
+    resp = client.get(
+        '/services/export', headers={'Accept-Encoding': 'gzip'}
+    )
+    assert resp.is_streamed
+    assert resp.content_encoding == 'gzip'
+    assert 'Accept-Encoding' in resp.vary
+    rows = list(csv.reader(StringIO(gzip.decompress(resp.data).decode())))
+    assert rows[0] == ['id', 'name', 'price', 'category', 'unit']
+    assert rows[1][1:] == ['Test Service', '1.00', 'Test Category', 'pc']
+
+    app.config['EXPORT_GZIP_LEVEL'] = 0
+    resp = client.get(
+        '/services/export', headers={'Accept-Encoding': 'gzip'}
+    )
+    assert resp.content_encoding is None
+
+
+def test_export_units_and_categories_csv(client, login):
+    login()
+    resp = client.get('/units/export')
+    assert resp.status_code == 200
+    assert resp.data.decode().splitlines() == ['name,abbreviation', 'Piece,pc']
+    resp = client.get('/categories/export')
+    assert resp.status_code == 200
+    assert resp.data.decode().splitlines() == ['name', 'Test Category']
+
+
 def test_import_services_csv_success(client, app, login):
     login()
     with app.app_context():
@@ -76,17 +122,10 @@ def test_import_services_csv_creates_related(client, app, login):
 
 def test_import_services_csv_validation_error(client, login):
     login()
-    bad_csv = 'wrong\n1,2,3\n'
-    data = {'file': (BytesIO(bad_csv.encode('utf-8')), 'bad.csv')}
-    resp = client.post(
-        '/services/import',
-        data=data,
-        content_type='multipart/form-data',
-    )
-    assert resp.status_code == 302
-    with client.session_transaction() as sess:
-        messages = [m for _c, m in sess.get('_flashes', [])]
-    assert any('Missing columns' in m for m in messages)
+    messages, job = _import(client, b'wrong\n1,2,3\n', 'bad.csv')
+    assert messages == [f'Import {job["job_id"]} of bad.csv started']
+    assert job['state'] == 'failed'
+    assert job['message'] == 'Missing columns'
 
 
 def test_import_services_csv_partial_import(client, app, login):
@@ -108,9 +147,13 @@ def test_import_services_csv_partial_import(client, app, login):
         bad = Service.query.filter_by(name='Bad').first()
         assert good is not None
         assert bad is None
-    with client.session_transaction() as sess:
-        messages = [m for _c, m in sess.get('_flashes', [])]
-    assert any('Row' in m and 'Missing data' in m for m in messages)
+    with app.app_context():
+        job = ImportJob.query.one()
+        assert job.status == 'done'
+        assert (job.rows, job.inserted, job.error_count) == (2, 1, 1)
+        assert job.errors == 'Row 3: Missing data'
+    resp = client.get(f'/services/import/{job.id}/errors')
+    assert resp.text == 'Row 3: Missing data'
 
 
 def test_import_services_csv_trims_and_case_insensitive(client, app, login):
@@ -210,3 +253,29 @@ def test_import_services_csv_updates_by_id(client, app, login):
         svc = Service.query.get(svc_id)
         assert svc.name == 'Renamed'
         assert svc.price == new_price
+
+
+def test_import_services_csv_detects_encoding(client, app, login):
+    login()
+    csv_data = 'name,price,category,unit\nМонтаж,2,Роботи,шт\n'
+    _, job = _import(client, b'\xef\xbb\xbf' + csv_data.encode())
+    assert (job['state'], job['inserted'], job['errors']) == ('done', 1, 0)
+    csv_data = csv_data.replace('Монтаж', 'Демонтаж')
+    _, job = _import(client, csv_data.encode('cp1251'))
+    assert (job['state'], job['inserted'], job['errors']) == ('done', 1, 0)
+    with app.app_context():
+        names = {s.name for s in Service.query}
+        assert {'Монтаж', 'Демонтаж'} <= names
+
+
+def test_import_services_csv_rejects_large_and_undecodable(client, app, login):
+    login()
+    app.config['IMPORT_MAX_BYTES'] = 100
+    data = b'name,price,category,unit\n' + b'x,1,,\n' * 50
+    assert _import(client, data) == (['File is larger than 100 bytes'], None)
+    app.config['IMPORT_MAX_BYTES'] = 0
+    app.config['IMPORT_FALLBACK_ENCODING'] = 'ascii'
+    _, job = _import(client, b'name,price,category,unit\n\xff,1,,\n')
+    assert (job['state'], job['message']) == ('failed', 'Invalid CSV')
+    with app.app_context():
+        assert Service.query.count() == 1
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+
+from admin_app import db
+from admin_app.models import Category, Service
+
+
+@pytest.fixture(params=['fts', 'prefix'])
+def search_app(request, app):
+    with app.app_context():
+        cat = Category(name='Plumbing')
+        db.session.add(cat)
+        db.session.flush()
+        db.session.add_all([
+            Service(name='Pipe repair', price=Decimal('10'), category=cat),
+            Service(name='Pipe replacement', price=Decimal('20')),
+            Service(name='Wall painting', price=Decimal('5')),
+        ])
+        db.session.commit()
+    if request.param == 'prefix':
+        app.extensions['service_search'] = {'fts': False}
+    return app
+
+
+def _search(client, q, **params):
+    resp = client.get('/api/v1/services/search', query_string={'q': q, **params})
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_search_matches_word_prefixes(client, search_app):
+    data = _search(client, 'pip rep')
+    names = [r['name'] for r in data['results']]
+    assert sorted(names) == ['Pipe repair', 'Pipe replacement']
+    assert data['total'] == 2
+
+
+def test_search_matches_category_name(client, search_app):
+    data = _search(client, 'plumb')
+    assert [r['name'] for r in data['results']] == ['Pipe repair']
+    assert data['results'][0]['category'] == 'Plumbing'
+
+
+def test_search_paginates(client, search_app):
+    first = _search(client, 'pipe', limit=1)
+    second = _search(client, 'pipe', limit=1, offset=1)
+    assert first['total'] == 2
+    assert len(first['results']) == len(second['results']) == 1
+    assert first['results'][0]['id'] != second['results'][0]['id']
+
+
+def test_search_follows_writes(client, search_app):
+    with search_app.app_context():
+        svc = Service.query.filter_by(name='Wall painting').first()
+        svc.name = 'Ceiling painting'
+        cat = Category.query.filter_by(name='Plumbing').first()
+        cat.name = 'Sanitary'
+        db.session.commit()
+    assert _search(client, 'wall')['results'] == []
+    assert _search(client, 'ceil')['total'] == 1
+    assert _search(client, 'sanit')['results'][0]['name'] == 'Pipe repair'
+
+
+def test_admin_services_page_search(client, app, login):
+    login()
+    with app.app_context():
+        db.session.add(Service(name='Roof cleaning', price=Decimal('3')))
+        db.session.commit()
+    resp = client.get('/services?q=roof')
+    assert b'Roof cleaning' in resp.data
+    assert b'Test Service' not in resp.data
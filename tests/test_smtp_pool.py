@@ -0,0 +1,125 @@
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+from admin_app.smtp_pool import SMTPPool
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.commands = []
+        self.alive = True
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        self.commands.append('starttls')
+
+    def login(self, user, password):
+        self.commands.append('login')
+
+    def noop(self):
+        self.commands.append('noop')
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected('closed')
+        return 250, b'OK'
+
+    def send_message(self, message):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected('closed')
+        if message['To'] == 'refused@example.com':
+            raise smtplib.SMTPRecipientsRefused({})
+        self.sent.append(message)
+
+    def quit(self):
+        self.alive = False
+
+    def close(self):
+        self.alive = False
+
+
+def _message(to='user@example.com'):
+    message = EmailMessage()
+    message['From'] = 'no-reply@example.com'
+    message['To'] = to
+    message.set_content('hi')
+    return message
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    return SMTPPool(
+        'localhost', 25, use_tls=True, username='u', password='p'
+    )
+
+
+def test_pool_reuses_authenticated_session(pool):
+    assert pool.send_many([_message(), _message()]) == [None, None]
+    pool.send(_message())
+    assert len(FakeSMTP.instances) == 1
+    smtp = FakeSMTP.instances[0]
+    assert smtp.commands == ['starttls', 'login']
+    assert len(smtp.sent) == 3
+
+
+def test_pool_checks_idle_session_with_noop(pool):
+    pool.noop_interval = 0
+    pool.send(_message())
+    pool.send(_message())
+    assert FakeSMTP.instances[0].commands[-1] == 'noop'
+    assert len(FakeSMTP.instances) == 1
+
+
+def test_pool_replaces_session_failing_noop(pool):
+    pool.noop_interval = 0
+    pool.send(_message())
+    FakeSMTP.instances[0].alive = False
+    pool.send(_message())
+    assert len(FakeSMTP.instances) == 2
+    assert len(FakeSMTP.instances[1].sent) == 1
+
+
+def test_pool_resends_when_reused_session_was_dropped(pool):
+    pool.send(_message())
+    # Dropped by the server without the NOOP check noticing.
+    FakeSMTP.instances[0].alive = False
+    pool.send(_message())
+    assert len(FakeSMTP.instances) == 2
+    assert len(FakeSMTP.instances[1].sent) == 1
+
+
+def test_pool_keeps_new_session_when_resent_message_is_refused(pool):
+    pool.send(_message())
+    FakeSMTP.instances[0].alive = False
+    results = pool.send_many([_message('refused@example.com'), _message()])
+    assert isinstance(results[0], smtplib.SMTPRecipientsRefused)
+    assert results[1] is None
+    # The replacement session carries on and goes back to the pool.
+    assert len(FakeSMTP.instances) == 2
+    assert len(FakeSMTP.instances[1].sent) == 1
+    assert list(pool._idle)[0].smtp is FakeSMTP.instances[1]
+
+
+def test_pool_reports_errors_per_message(pool):
+    results = pool.send_many(
+        [_message(), _message('refused@example.com'), _message()]
+    )
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert len(FakeSMTP.instances) == 1
+
+
+def test_pool_fails_batch_when_relay_is_down(pool, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise ConnectionRefusedError('refused')
+
+    monkeypatch.setattr(smtplib, 'SMTP', refuse)
+    results = pool.send_many([_message(), _message()])
+    assert all(isinstance(r, ConnectionRefusedError) for r in results)
+    with pytest.raises(ConnectionRefusedError):
+        pool.send(_message())